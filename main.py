@@ -1,136 +1,258 @@
 import sys
 import os
 
-# --- Add src to sys.path --- Must be before src imports!
-project_root = os.path.dirname(os.path.abspath(__file__))
-src_path = os.path.join(project_root, 'src')
-if src_path not in sys.path:
-    sys.path.insert(0, src_path)
-
-# add rag to sys.path
-rag_path = os.path.join(project_root, 'src/rag')
-if rag_path not in sys.path:
-    sys.path.insert(0, rag_path)
+# --- Add src and src/rag to sys.path --- Must be before src imports!
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+for _path in (os.path.join(_PROJECT_ROOT, 'src'), os.path.join(_PROJECT_ROOT, 'src', 'rag')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 # ---------------------------
 
+# --- Load .env once, before any project module reads the environment ---
+import types
+from dotenv import load_dotenv
+load_dotenv(override=False)
+# Read-only snapshot of the environment as main sees it
+_ENV = types.MappingProxyType(dict(os.environ))
+# ---------------------------
+
+import asyncio
 import signal
 import traceback
 import argparse
-import sys
-from dotenv import load_dotenv
-import time
-
-from core.alpaca import Alpaca
-from utils.config_loader import ConfigLoader
-from core.voice_loop import run_voice_interaction_loop
-from core.text_loop import run_text_interaction_loop
-from rag.indexer import run_indexing
-from utils.summarizer import summarize_conversation, save_summary
-    
-def main():
-    load_dotenv()
+import logging
+import threading
 
-    # --- Argument Parsing ---
+# Heavy project modules (torch, transformers, minirag, audio stack) are imported
+# lazily inside main() so `--help` stays instant and each mode only loads what it uses.
+
+def _build_parser():
+    """Builds the CLI argument parser. Called once at import."""
     parser = argparse.ArgumentParser(description="Alpaca AI Voice/Text Assistant")
-    default_mode = os.getenv('DEFAULT_MODE', 'voice').lower()
     parser.add_argument(
         '--mode',
         type=str,
         choices=['voice', 'text'],
-        default=default_mode,
+        default=None,
         help="Run in 'voice' mode (voice input/output) or 'text' mode (text input/output). Default from DEFAULT_MODE env var."
     )
-    args = parser.parse_args()
-    run_mode = args.mode
-    print(f"Running in {run_mode.upper()} mode.")
-    # --- End Argument Parsing ---
+    parser.add_argument(
+        '--reload-config',
+        action='store_true',
+        help="Discard any cached config file parses and re-read the JSON configs from disk."
+    )
+    return parser
 
-    print("Initializing AI Voice assistant...")
-    assistant = None
-    
-    data_path_value = os.getenv("DATA_PATH", "./data/dataset")
-    
-    # --- RAG Indexing --- 
+_PARSER = _build_parser()
+
+# Full tracebacks walk every frame and read source lines from disk; only pay for them when debugging
+_DEBUG = bool(_ENV.get('ALPACA_DEBUG'))
+
+def _report_exception(e):
+    """Prints a full traceback when ALPACA_DEBUG is set, otherwise a one-line summary."""
+    if _DEBUG:
+        traceback.print_exc()
+    else:
+        print(f"{type(e).__name__}: {e}")
+
+async def index_documents():
+    """Runs RAG indexing in a worker thread, reporting (not raising) indexing errors."""
     try:
         print("--- Running RAG Indexing --- ")
-        run_indexing()
+        from rag.indexer import run_indexing
+        # run_indexing is synchronous and drives its own event loop for MiniRAG inserts
+        await asyncio.to_thread(run_indexing)
         print("--- RAG Indexing Complete --- \n")
     except Exception as e:
         print(f"***** CRITICAL ERROR DURING RAG INDEXING *****: {e}")
         print("***** RAG features may be unavailable or outdated. *****")
-        traceback.print_exc()
+        _report_exception(e)
+
+def summarize_session(history, llm_handler_inst, data_path_value):
+    """Summarizes the conversation history and saves it under the data path."""
+    try:
+        from utils.summarizer import summarize_conversation, save_summary
+        summary = summarize_conversation(history, llm_handler_inst)
+        if summary:
+            save_summary(summary, len(history), base_data_path=data_path_value) 
+    except Exception as summary_e:
+        print(f"[Summarizer] Error during summarization/saving: {summary_e}")
+        _report_exception(summary_e)
+
+def create_assistant(assistant_params, run_mode):
+    """Imports and constructs Alpaca. Run in a worker thread: the import alone pulls in torch and the model stacks."""
+    from core.alpaca import Alpaca
+    return Alpaca(**assistant_params, mode=run_mode)
+
+def cleanup_components(component_manager):
+    """Releases all handlers held by the component manager."""
+    try:
+        component_manager.cleanup()
+    except Exception as cleanup_e:
+        print(f"Error during component cleanup: {cleanup_e}")
+        _report_exception(cleanup_e)
+
+def _warmup(assistant):
+    """Pays first-use costs (TTS kernels, LLM weights) off the critical path; results are discarded."""
+    component_manager = getattr(assistant, 'component_manager', None)
+    if component_manager is None:
+        return
+    tts_handler = getattr(component_manager, 'tts_handler', None)
+    if tts_handler is not None:
+        try:
+            tts_handler.synthesize("warmup")
+        except Exception as e:
+            print(f"[Warmup] TTS warmup failed: {e}")
+    llm_handler_inst = getattr(component_manager, 'llm_handler', None)
+    if llm_handler_inst is not None:
+        try:
+            import ollama
+            # An empty prompt makes Ollama load the model into memory without generating
+            ollama.generate(model=llm_handler_inst.model_name, prompt="")
+        except Exception as e:
+            print(f"[Warmup] LLM warmup failed: {e}")
+
+async def main():
+    # --- Argument Parsing ---
+    args = _PARSER.parse_args()
+    run_mode = args.mode or _ENV.get('DEFAULT_MODE', 'voice').lower()
+    print(f"Running in {run_mode.upper()} mode.")
+    # --- End Argument Parsing ---
+
+    # --- Shutdown Signals ---
+    # SIGTERM (docker stop / systemd) and SIGHUP must take the same graceful path as
+    # Ctrl+C so the session still gets summarized and components cleaned up.
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    shutdown_event = asyncio.Event()
+
+    def handle_shutdown_signal(sig):
+        if shutdown_event.is_set():
+            print(f"\nReceived {sig.name} again; shutdown already in progress.")
+            return
+        shutdown_event.set()
+        print(f"\nReceived {sig.name}. Initiating graceful shutdown... (press Ctrl+C again to force quit)")
+        # Restore the default handlers so a second signal (KeyboardInterrupt for SIGINT) can still
+        # break out of a summarization or cleanup that hangs
+        for registered in registered_signals:
+            loop.remove_signal_handler(registered)
+        # Cancelling interrupts whatever the loop is awaiting right now, not just at the next turn boundary
+        main_task.cancel()
+
+    registered_signals = []
+    for sig in (signal.SIGINT, signal.SIGTERM, getattr(signal, 'SIGHUP', None)):
+        if sig is None:
+            continue
+        try:
+            loop.add_signal_handler(sig, handle_shutdown_signal, sig)
+            registered_signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass # Not supported on this platform/loop (e.g. Windows); asyncio.run still handles Ctrl+C
+    # ------------------------
+
+    print("Initializing AI Voice assistant...")
+    assistant = None
+    
+    data_path_value = _ENV.get("DATA_PATH", "./data/dataset")
+    
+    # --- RAG Indexing (runs concurrently with config loading and model init) ---
+    index_task = asyncio.create_task(index_documents())
     # -----------------------------------
+    from utils.config_loader import ConfigLoader, clear_config_cache
+    if args.reload_config:
+        clear_config_cache()
     config_loader = ConfigLoader()
-    assistant_params = config_loader.load_all()
-
-    if assistant_params is None:
-         print("Failed to load configurations. Exiting.")
-         sys.exit(1)
 
+    # Config loading sits inside the try so a shutdown signal (which cancels this task) or a failed
+    # load still takes the graceful path below and unregisters the signal handlers
     try:
-        assistant = Alpaca(**assistant_params, mode=run_mode)
+        # Loading off the loop lets index_task actually start now rather than after the config is read
+        assistant_params = await asyncio.to_thread(config_loader.load_all)
+
+        if assistant_params is None:
+             print("Failed to load configurations. Exiting.")
+             await index_task
+             sys.exit(1)
+
+        alpaca_task = asyncio.to_thread(create_assistant, assistant_params, run_mode)
+        assistant, _ = await asyncio.gather(alpaca_task, index_task)
+        # Warm models while the user composes the first turn; daemon so it never delays exit
+        threading.Thread(target=_warmup, args=(assistant,), daemon=True, name="alpaca-warmup").start()
         
         duration = assistant.duration_arg
         timeout = assistant.timeout_arg
         phrase_limit = assistant.phrase_limit_arg
 
         if run_mode == 'voice':
-            run_voice_interaction_loop(assistant, duration, timeout, phrase_limit)
+            from core.voice_loop import run_voice_interaction_loop
+            await run_voice_interaction_loop(assistant, duration, timeout, phrase_limit)
         elif run_mode == 'text':
-            run_text_interaction_loop(assistant)
+            from core.text_loop import run_text_interaction_loop
+            await run_text_interaction_loop(assistant)
         else:
             print(f"Error: Invalid run mode '{run_mode}'")
             sys.exit(1)
 
         print("Main loop finished.")
 
-    except KeyboardInterrupt:
-         print("\nKeyboard interrupt detected by main. Initiating shutdown...")
+    except (KeyboardInterrupt, asyncio.CancelledError):
+         print("\nShutdown requested. Initiating shutdown...")
          
     except Exception as e:
          print(f"\nAn unexpected fatal error occurred during setup or loop: {e}")
-         traceback.print_exc()
+         _report_exception(e)
     
     finally:
         print("\n--- Attempting Session Summarization --- ")
+        summary_task = None
+        component_manager = None
         if assistant: 
-            if hasattr(assistant, 'conversation_manager') and \
-               hasattr(assistant, 'component_manager') and \
-               hasattr(assistant.component_manager, 'llm_handler'):
-                
-                conv_manager = assistant.conversation_manager
-                llm_handler_inst = assistant.component_manager.llm_handler
-                history = conv_manager.get_history()
-                
-                if not history:
-                    print("[Summarizer] No conversation history to summarize.")
-                else:
-                    try:
-                        summary = summarize_conversation(history, llm_handler_inst)
-                        if summary:
-                            save_summary(summary, len(history), base_data_path=data_path_value) 
-                    except Exception as summary_e:
-                        print(f"[Summarizer] Error during summarization/saving: {summary_e}")
-                        traceback.print_exc()
-            else:
+            try:
+                component_manager = assistant.component_manager
+                llm_handler_inst = component_manager.llm_handler
+                history = assistant.conversation_manager.get_history()
+            except AttributeError:
+                llm_handler_inst = history = None
+
+            if llm_handler_inst is None or history is None:
                 print("[Summarizer] Assistant components missing, cannot summarize.")
+            elif not history:
+                print("[Summarizer] No conversation history to summarize.")
+            else:
+                # Holds its own llm_handler reference, so cleanup() below can't tear it down mid-summary
+                # Copy: the summary must see one consistent history even if something still touches the live list
+                summary_task = asyncio.to_thread(summarize_session, list(history), llm_handler_inst, data_path_value)
         else:
             print("[Summarizer] Assistant object not created, cannot summarize.")
-        print("--- Session Summarization Finished --- ")
         
-        if assistant and hasattr(assistant, 'component_manager'):
-            try:
-                assistant.component_manager.cleanup()
-            except Exception as cleanup_e:
-                print(f"Error during component cleanup: {cleanup_e}")
-                traceback.print_exc()
+        cleanup_task = None
+        if component_manager is not None:
+            cleanup_task = asyncio.to_thread(cleanup_components, component_manager)
+
+        # Summarization waits on the LLM while cleanup is local teardown; overlap the two
+        pending = [task for task in (summary_task, cleanup_task) if task is not None]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        print("--- Session Summarization Finished --- ")
+        for sig in registered_signals:
+            loop.remove_signal_handler(sig)
         print("AI Voice assistant shut down process complete.")
 
 if __name__ == "__main__":
+    if sys.platform != 'win32': # uvloop has no Windows support
+        try:
+            import uvloop # Optional: libuv-based event loop, lower per-await overhead
+            uvloop.install()
+        except ImportError:
+            pass # Not installed; use the default asyncio loop
+    # Never inherit PYTHONASYNCIODEBUG / -X dev slow-callback tracing in normal runs
+    logging.getLogger('asyncio').setLevel(logging.WARNING)
     try:
-        main()
+        asyncio.run(main(), debug=False)
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(f"\nUnhandled top-level exception during execution: {e}")
-        traceback.print_exc()
+        _report_exception(e)
     finally:
         print("Application exiting.")
\ No newline at end of file
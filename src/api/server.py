@@ -1,34 +1,37 @@
 import asyncio
 import os
 import sys
+import threading
+import uuid
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Union, Optional
+from typing import Dict, Any, Union, Optional, TYPE_CHECKING
 from asyncio import Queue
+from pathlib import Path
 
 # --- Add project root to sys.path ---
 # This allows importing modules from src, utils, etc.
-project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-src_path = os.path.join(project_root, 'src')
-if src_path not in sys.path:
-    sys.path.insert(0, src_path)
-
-# add rag to sys.path
-rag_path = os.path.join(project_root, 'src/rag')
-if rag_path not in sys.path:
-    sys.path.insert(0, rag_path)
+# Resolved once; the membership check keeps repeated imports (--reload workers) from stacking entries
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+for _path in (_PROJECT_ROOT / 'src', _PROJECT_ROOT / 'src' / 'rag'):
+    _path = str(_path)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
 # --- Imports from your project ---
-from core.alpaca import Alpaca
-from utils.config_loader import ConfigLoader
+# Alpaca (torch, transformers, audio stack) and ConfigLoader are imported in startup_event so that
+# importing this module (reload workers, route introspection) only costs FastAPI + stdlib
+if TYPE_CHECKING:
+    from core.alpaca import Alpaca
 # from core.alpaca_interaction import AlpacaInteraction # Might be needed later
 import traceback # For error logging
 from dotenv import load_dotenv
+from utils import fastjson
 # ---------------------------------
 
 # --- Globals ---
 # This will hold the initialized Alpaca instance
-alpaca_instance: Union[Alpaca, None] = None
+alpaca_instance: Union["Alpaca", None] = None
 # This will hold the configuration loaded at startup
 loaded_config_data: Union[Dict[str, Any], None] = None
 # ----------------
@@ -39,12 +42,70 @@ app = FastAPI(
     version="0.1.0"
 )
 
-# --- State Variables ---
-# For simplicity, we manage task state globally for a single connection.
-# In a multi-user scenario, this state would need to be managed per WebSocket connection.
-current_interaction_task: Optional[asyncio.Task] = None
-queue_reader_task: Optional[asyncio.Task] = None
-interaction_queue: Optional[Queue] = None
+# --- Connection State ---
+class ConnectionState:
+    """Interaction task, queue reader and queue belonging to one WebSocket connection."""
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.interaction_task: Optional[asyncio.Task] = None
+        self.interaction_kind: Optional[str] = None # 'voice' or 'text'
+        self.queue_reader_task: Optional[asyncio.Task] = None
+        self.interaction_queue: Optional[Queue] = None
+
+    def is_busy(self) -> bool:
+        return self.interaction_task is not None and not self.interaction_task.done()
+
+class ConnectionManager:
+    """Tracks connected clients so each has its own tasks and cancellation scope."""
+    def __init__(self):
+        self.active: Dict[str, ConnectionState] = {}
+
+    def connect(self, websocket: WebSocket) -> str:
+        """Registers a new connection and returns its client id."""
+        client_id = uuid.uuid4().hex
+        self.active[client_id] = ConnectionState(websocket)
+        return client_id
+
+    def get(self, client_id: str) -> Optional[ConnectionState]:
+        return self.active.get(client_id)
+
+    async def cancel_tasks(self, client_id: str):
+        """Cancels this client's interaction and queue reader and waits for them to unwind."""
+        state = self.active.get(client_id)
+        if state is None:
+            return
+        tasks = [task for task in (state.interaction_task, state.queue_reader_task) if task and not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        state.interaction_task = None
+        state.queue_reader_task = None
+        state.interaction_queue = None
+
+    async def disconnect(self, client_id: str):
+        """Cancels the client's tasks and forgets the connection."""
+        await self.cancel_tasks(client_id)
+        self.active.pop(client_id, None)
+
+    async def disconnect_all(self):
+        for client_id in list(self.active):
+            await self.disconnect(client_id)
+
+connection_manager = ConnectionManager()
+# Seconds shutdown waits for component cleanup before moving on
+COMPONENT_CLEANUP_TIMEOUT = float(os.getenv('COMPONENT_CLEANUP_TIMEOUT', '5'))
+# There is one Alpaca instance (one microphone, one conversation history, one OutputHandler),
+# so interactions from different clients take turns on it
+# Created on first use inside the running loop: on Python 3.9 a module-level Lock binds to
+# get_event_loop() at import, not the loop uvicorn serves on
+_assistant_lock: Optional[asyncio.Lock] = None
+
+def get_assistant_lock() -> asyncio.Lock:
+    global _assistant_lock
+    if _assistant_lock is None:
+        _assistant_lock = asyncio.Lock()
+    return _assistant_lock
 # ---------------------
 
 @app.on_event("startup")
@@ -69,9 +130,11 @@ async def startup_event():
 
     # --- Load Configuration ---
     try:
+        from utils.config_loader import ConfigLoader
         config_loader = ConfigLoader()
         # Pass specific paths if necessary, otherwise uses defaults / env vars
-        assistant_params = config_loader.load_all()
+        # load_all memoizes per (config mtimes, env) for the process lifetime; run it off the loop like main.py does
+        assistant_params = await asyncio.to_thread(config_loader.load_all)
         if not assistant_params:
             print("FATAL: Failed to load configurations for API server. Check config files and .env")
             return
@@ -92,6 +155,7 @@ async def startup_event():
         # For now, assume it loads necessary components based on config.
         # --- CORRECTION: Need 'voice' mode to load audio components for voice interactions --- 
         print("Initializing Alpaca instance (mode='voice')...")
+        from core.alpaca import Alpaca
         alpaca_instance = Alpaca(**loaded_config_data, mode='voice') # Use 'voice' mode
         print("Alpaca instance initialized successfully for API.")
     except Exception as e:
@@ -102,28 +166,51 @@ async def startup_event():
     # ------------------------
     print("API Server startup complete.")
 
+def summarize_session(history, llm_handler_inst, data_path_value):
+    """Summarizes the conversation history and saves it under the data path. Blocking; run in a thread."""
+    from utils.summarizer import summarize_conversation, save_summary
+    summary = summarize_conversation(history, llm_handler_inst)
+    if summary:
+        save_summary(summary, len(history), base_data_path=data_path_value)
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleans up resources on server shutdown."""
-    global alpaca_instance, loaded_config_data, current_interaction_task, queue_reader_task
+    global alpaca_instance, loaded_config_data
     print("API Server shutting down...")
     # --- Cancel any running tasks ---
-    if current_interaction_task and not current_interaction_task.done():
-        print("Cancelling active interaction task...")
-        current_interaction_task.cancel()
-    if queue_reader_task and not queue_reader_task.done():
-        print("Cancelling queue reader task...")
-        queue_reader_task.cancel()
+    if connection_manager.active:
+        print(f"Cancelling tasks for {len(connection_manager.active)} connection(s)...")
+        await connection_manager.disconnect_all()
+    # -----------------------------
+    # --- Summarize the session (uvicorn routes SIGINT/SIGTERM here) ---
+    if alpaca_instance:
+        try:
+            history = alpaca_instance.conversation_manager.get_history()
+            llm_handler_inst = alpaca_instance.component_manager.llm_handler
+            if llm_handler_inst and any(msg['role'] == 'user' for msg in history):
+                print("Summarizing session before shutdown...")
+                # Summary and its fsync'd save both run off the event loop; a copy keeps the history stable
+                await asyncio.to_thread(summarize_session, list(history), llm_handler_inst, os.getenv("DATA_PATH", "./data/dataset"))
+        except AttributeError:
+            print("[Summarizer] Assistant components missing, cannot summarize.")
+        except Exception as e:
+            print(f"[Summarizer] Error during shutdown summarization: {e}")
+            _print_traceback()
     # -----------------------------
     # --- Cleanup Alpaca Components ---
     if alpaca_instance and hasattr(alpaca_instance, 'component_manager'):
         print("Cleaning up Alpaca components...")
         try:
-            # Assuming component_manager.cleanup() handles stopping threads/processes etc.
-            # If cleanup needs to be async, adjust Alpaca/ComponentManager accordingly.
-            # For now, assuming it's synchronous or handles async internally.
-            alpaca_instance.component_manager.cleanup()
+            # cleanup() joins threads and terminates PyAudio; run it off the event loop and don't let
+            # a stuck device hold up shutdown (connection tasks were already cancelled above)
+            await asyncio.wait_for(
+                asyncio.to_thread(alpaca_instance.component_manager.cleanup),
+                timeout=COMPONENT_CLEANUP_TIMEOUT
+            )
             print("Alpaca components cleaned up.")
+        except asyncio.TimeoutError:
+            print(f"Warning: Alpaca component cleanup exceeded {COMPONENT_CLEANUP_TIMEOUT}s; continuing shutdown.")
         except Exception as e:
             print(f"Error during Alpaca component cleanup: {e}")
             traceback.print_exc()
@@ -135,8 +222,6 @@ async def shutdown_event():
     # Clear global state
     alpaca_instance = None
     loaded_config_data = None
-    current_interaction_task = None
-    queue_reader_task = None
     print("API Server shutdown complete.")
 
 
@@ -155,12 +240,115 @@ async def get_config():
         )
 
 # --- WebSocket Helper ---
+def _debug_enabled():
+    """True when ALPACA_DEBUG is set (read per call: .env is only loaded in startup_event)."""
+    return bool(os.getenv('ALPACA_DEBUG'))
+
+def _print_traceback():
+    """Per-message error paths: the one-line error is always printed, the full traceback only when debugging."""
+    if _debug_enabled():
+        traceback.print_exc()
+
+# Starlette's send_json encodes with stdlib json; fastjson uses orjson/ujson when installed.
+# Frames stay text frames so clients parse them exactly as before.
+async def send_json(websocket: WebSocket, message: Dict[str, Any]):
+    """Serializes message with the fastest available JSON backend and sends it as a text frame."""
+    await websocket.send_text(fastjson.dumps(message))
+
+# Streamed once per LLM token; only the text needs encoding
+_LLM_CHUNK_PREFIX = '{"type":"llm_chunk","text":'
+
+# Fixed status payloads, encoded once at import and sent with send_text
+_STATUS_PROCESSING = fastjson.dumps({"type": "status", "state": "Processing"})
+_STATUS_IDLE = fastjson.dumps({"type": "status", "state": "Idle"})
+_STATUS_IDLE_NOTHING_TO_STOP = fastjson.dumps({"type": "status", "state": "Idle", "message": "Stop command received, nothing active to stop."})
+
+async def send_llm_chunk(websocket: WebSocket, text: str):
+    """Sends an llm_chunk message without building the dict."""
+    await websocket.send_text(_LLM_CHUNK_PREFIX + fastjson.dumps(text) + '}')
+
+# Tokens are coalesced into one llm_chunk frame per this many chunks or this many seconds, whichever comes first
+LLM_CHUNK_BATCH_SIZE = 16
+LLM_CHUNK_FLUSH_INTERVAL = 0.01
+# Bounded so a slow client applies backpressure to the generator thread instead of buffering the whole response
+LLM_CHUNK_QUEUE_SIZE = 64
+_STREAM_END = object()
+
+def _pump_generator(response_generator, chunk_queue: Queue, loop: asyncio.AbstractEventLoop, stop_event: threading.Event):
+    """Worker thread: feeds the blocking response generator into chunk_queue, then _STREAM_END."""
+    try:
+        for chunk in response_generator:
+            if stop_event.is_set():
+                break
+            asyncio.run_coroutine_threadsafe(chunk_queue.put(chunk), loop).result()
+    finally:
+        # Only the iterating thread may close the generator (releases the Ollama stream early on stop)
+        close = getattr(response_generator, 'close', None)
+        if close:
+            close()
+        if not stop_event.is_set():
+            asyncio.run_coroutine_threadsafe(chunk_queue.put(_STREAM_END), loop).result()
+
+async def stream_llm_response(websocket: WebSocket, response_generator) -> str:
+    """Streams a sync response generator to the client as coalesced llm_chunk frames. Returns the full text.
+
+    The generator runs in a worker thread so a blocking next() (model decode, RAG) never stalls the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    chunk_queue: Queue = Queue(maxsize=LLM_CHUNK_QUEUE_SIZE)
+    stop_pump = threading.Event()
+    pump_future = loop.run_in_executor(None, _pump_generator, response_generator, chunk_queue, loop, stop_pump)
+    response_parts = [] # Joined once at the end; += on a growing str is quadratic in the worst case
+    pending_chunks = []
+    flush_deadline = None
+    get_task = None
+    try:
+        while True:
+            if get_task is None:
+                get_task = asyncio.ensure_future(chunk_queue.get())
+            if pending_chunks:
+                # asyncio.wait leaves get_task pending on timeout (unlike wait_for, which can also swallow a cancel)
+                done, _ = await asyncio.wait((get_task,), timeout=max(0.0, flush_deadline - loop.time()))
+                if not done:
+                    await send_llm_chunk(websocket, "".join(pending_chunks))
+                    pending_chunks.clear()
+                    continue
+            chunk = await get_task
+            get_task = None
+            if chunk is _STREAM_END:
+                break
+            if chunk:
+                response_parts.append(chunk)
+                if not pending_chunks:
+                    flush_deadline = loop.time() + LLM_CHUNK_FLUSH_INTERVAL
+                pending_chunks.append(chunk)
+                if len(pending_chunks) >= LLM_CHUNK_BATCH_SIZE:
+                    await send_llm_chunk(websocket, "".join(pending_chunks))
+                    pending_chunks.clear()
+        if pending_chunks:
+            await send_llm_chunk(websocket, "".join(pending_chunks))
+        await pump_future # Re-raises anything the generator raised
+        return "".join(response_parts)
+    finally:
+        if get_task is not None and not get_task.done():
+            get_task.cancel()
+        if not pump_future.done():
+            # Stop the worker and unblock a put waiting on a full queue
+            stop_pump.set()
+            while not chunk_queue.empty():
+                chunk_queue.get_nowait()
+
 async def handle_interaction_queue(websocket: WebSocket, queue: Queue):
     """Reads messages from the interaction queue and sends them to the client."""
     try:
         while True:
             message = await queue.get()
-            await websocket.send_json(message)
+            if message.get("type") == "audio_chunk":
+                # Small JSON header, then the PCM as a binary frame: no base64 inflation or decode per chunk
+                await send_json(websocket, {"type": "audio_header", "sample_rate": message.get("sample_rate"), "format": message.get("format")})
+                await websocket.send_bytes(message["data"])
+            else:
+                await send_json(websocket, message)
             queue.task_done()
             # If the message indicates the end of interaction (e.g., Idle, Error, Interrupted, Cancelled, Disabled), stop reading
             if message.get("type") == "status" and message.get("state") in ["Error", "Cancelled", "Disabled"]:
@@ -172,49 +360,76 @@ async def handle_interaction_queue(websocket: WebSocket, queue: Queue):
         print("[QueueReader] WebSocket disconnected.")
     except Exception as e:
         print(f"[QueueReader] Error: {e}")
-        traceback.print_exc()
+        _print_traceback()
         # Try to send error to client if possible
         try:
-            await websocket.send_json({"type": "error", "message": f"Queue reader error: {e}", "state": "Error"})
+            await send_json(websocket, {"type": "error", "message": f"Queue reader error: {e}", "state": "Error"})
         except:
             pass # Ignore if sending fails
     finally:
         print("[QueueReader] Exiting task.")
 
+async def run_voice_interaction(status_queue: Queue, duration, timeout, phrase_limit):
+    """Runs the voice loop while holding the shared assistant."""
+    async with get_assistant_lock():
+        await alpaca_instance.interaction_handler.run_voice_interaction_loop(
+            status_queue=status_queue,
+            duration=duration,
+            timeout=timeout,
+            phrase_limit=phrase_limit
+        )
+
+async def run_text_interaction(websocket: WebSocket, text: str):
+    """Generates a response to one text message and streams it to the client. Cancelled by 'stop' or disconnect."""
+    try:
+        if not hasattr(alpaca_instance, 'interaction_handler'):
+            raise AttributeError("Alpaca instance lacks an 'interaction_handler'")
+        async with get_assistant_lock():
+            response_generator = await alpaca_instance.interaction_handler.run_single_text_interaction(text)
+            # Flip to Processing only once generation has actually started
+            await websocket.send_text(_STATUS_PROCESSING)
+            # Cancelling this task stops stream_llm_response, which has the worker close the generator
+            full_response = await stream_llm_response(websocket, response_generator)
+        await send_json(websocket, {"type": "status", "state": "Idle", "final_response": full_response})
+        print("Text interaction streaming complete.")
+    except asyncio.CancelledError:
+        print("[TextInteraction] Task cancelled.")
+        raise
+    except WebSocketDisconnect:
+        print("[TextInteraction] WebSocket disconnected.")
+    except AttributeError as ae:
+         print(f"Error accessing interaction handler: {ae}")
+         _print_traceback()
+         await send_json(websocket, {"type": "error", "message": f"Server configuration error: {ae}", "state": "Error"})
+    except Exception as e:
+        print(f"Error during text interaction: {e}")
+        _print_traceback()
+        await send_json(websocket, {"type": "error", "message": f"Error processing text: {e}", "state": "Error"})
+        await websocket.send_text(_STATUS_IDLE)
+
 # --- End WebSocket Helper ---
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """Handles the main WebSocket connection for real-time interaction."""
-    global alpaca_instance, current_interaction_task, queue_reader_task, interaction_queue
-
     client_address = f"{websocket.client.host}:{websocket.client.port}"
     print(f"WebSocket connection established from {client_address}")
 
-    # --- Simple single-client handling ---
-    # If an interaction is somehow active from a previous connection, try to cancel it.
-    if current_interaction_task and not current_interaction_task.done():
-        print(f"Warning: Cancelling remnant interaction task from previous connection.")
-        current_interaction_task.cancel()
-    if queue_reader_task and not queue_reader_task.done():
-        print(f"Warning: Cancelling remnant queue reader task from previous connection.")
-        queue_reader_task.cancel()
-    current_interaction_task = None
-    queue_reader_task = None
-    interaction_queue = None # Reset queue on new connection
-    # -------------------------------------
-
     await websocket.accept()
+    # Per-connection state: other clients' tasks are never touched by this connection
+    client_id = connection_manager.connect(websocket)
+    state = connection_manager.get(client_id)
 
     try:
         while True:
             data = await websocket.receive_json()
-            print(f"Received WS message: {data}")
+            if _debug_enabled():
+                print(f"Received WS message: {data}")
 
             action = data.get("action")
 
             if not alpaca_instance:
-                await websocket.send_json({"type": "error", "message": "Alpaca assistant not initialized.", "state": "Error"})
+                await send_json(websocket, {"type": "error", "message": "Alpaca assistant not initialized.", "state": "Error"})
                 continue
 
             # --- Action Handling ---
@@ -222,18 +437,21 @@ async def websocket_endpoint(websocket: WebSocket):
                 mode = data.get("mode", "voice")
                 print(f"Received 'start' action, mode: {mode}")
 
-                if current_interaction_task and not current_interaction_task.done():
-                     await websocket.send_json({"type": "error", "message": "An interaction is already in progress.", "state": "Busy"})
+                if state.is_busy():
+                     await send_json(websocket, {"type": "error", "message": "An interaction is already in progress.", "state": "Busy"})
+                     continue
+                if get_assistant_lock().locked():
+                     await send_json(websocket, {"type": "error", "message": "The assistant is busy with another client.", "state": "Busy"})
                      continue
 
                 if mode == "voice":
                     # --- Start Voice Interaction ---
                     try:
-                        interaction_queue = Queue()
+                        state.interaction_queue = Queue()
 
                         # Start the task to read from the queue and send to websocket
-                        queue_reader_task = asyncio.create_task(
-                            handle_interaction_queue(websocket, interaction_queue),
+                        state.queue_reader_task = asyncio.create_task(
+                            handle_interaction_queue(websocket, state.interaction_queue),
                             name=f"QueueReader_{client_address}"
                         )
 
@@ -244,15 +462,11 @@ async def websocket_endpoint(websocket: WebSocket):
                         
                         print(f"Starting voice interaction task (timeout={timeout}, phrase_limit={phrase_limit}, duration={duration})...")
                         # Start the actual interaction task, passing the queue
-                        current_interaction_task = asyncio.create_task(
-                            alpaca_instance.interaction_handler.run_voice_interaction_loop(
-                                status_queue=interaction_queue,
-                                duration=duration,
-                                timeout=timeout,
-                                phrase_limit=phrase_limit
-                            ),
+                        state.interaction_task = asyncio.create_task(
+                            run_voice_interaction(state.interaction_queue, duration, timeout, phrase_limit),
                             name=f"VoiceInteractionLoop_{client_address}"
                         )
+                        state.interaction_kind = "voice"
 
                         # Optional: Monitor the interaction task completion/failure
                         # You could add a callback or await it here, but that blocks receive loop.
@@ -261,41 +475,35 @@ async def websocket_endpoint(websocket: WebSocket):
 
                     except AttributeError as ae:
                          print(f"Error accessing alpaca instance attributes for voice start: {ae}")
-                         traceback.print_exc()
-                         await websocket.send_json({"type": "error", "message": f"Server configuration error: {ae}", "state": "Error"})
+                         _print_traceback()
+                         await send_json(websocket, {"type": "error", "message": f"Server configuration error: {ae}", "state": "Error"})
                          # Clean up queue/tasks if partially created
-                         if queue_reader_task and not queue_reader_task.done(): queue_reader_task.cancel()
-                         if interaction_queue: interaction_queue = None
-                         queue_reader_task = None
-                         current_interaction_task = None
+                         await connection_manager.cancel_tasks(client_id)
                     except Exception as e:
                          print(f"Error starting voice interaction: {e}")
-                         traceback.print_exc()
-                         await websocket.send_json({"type": "error", "message": f"Failed to start interaction: {e}", "state": "Error"})
-                         if queue_reader_task and not queue_reader_task.done(): queue_reader_task.cancel()
-                         if interaction_queue: interaction_queue = None
-                         queue_reader_task = None
-                         current_interaction_task = None
+                         _print_traceback()
+                         await send_json(websocket, {"type": "error", "message": f"Failed to start interaction: {e}", "state": "Error"})
+                         await connection_manager.cancel_tasks(client_id)
                     # --- End Start Voice Interaction ---
 
                 elif mode == "text":
                      # This assumes text interaction is short and doesn't need complex task management
                      # Re-using existing text logic here
                      text = data.get("text", "") # Allow text with start action? Or require send_text? Let's assume require send_text.
-                     await websocket.send_json({"type": "info", "message": "Use 'send_text' action for text interactions."})
+                     await send_json(websocket, {"type": "info", "message": "Use 'send_text' action for text interactions."})
                      # If you want start to trigger a text loop, implement similar task logic as voice
                 else:
-                     await websocket.send_json({"type": "error", "message": f"Unsupported start mode: {mode}", "state": "Error"})
+                     await send_json(websocket, {"type": "error", "message": f"Unsupported start mode: {mode}", "state": "Error"})
 
 
             elif action == "stop":
                 print("Received 'stop' action")
                 interrupted_by_client = False
-                if current_interaction_task and not current_interaction_task.done():
+                if state.is_busy():
                     print("Cancelling interaction task due to 'stop' command.")
-                    current_interaction_task.cancel()
-                    # Wait briefly for cancellation to propagate if needed, though not strictly necessary
-                    # await asyncio.sleep(0.01)
+                    state.interaction_task.cancel()
+                    # Wait for the task to unwind so LLM/RAG work is released before acknowledging
+                    await asyncio.gather(state.interaction_task, return_exceptions=True)
                     interrupted_by_client = True
                 else:
                      print("No active interaction task to stop.")
@@ -305,10 +513,10 @@ async def websocket_endpoint(websocket: WebSocket):
                 # or on WebSocketDisconnect.
                 # We don't need to explicitly cancel queue_reader_task here unless it gets stuck.
 
-                # Reset global task/queue variables after cancellation attempt
-                current_interaction_task = None
-                queue_reader_task = None # Let it finish naturally
-                interaction_queue = None # Clear queue reference
+                # Reset this connection's task/queue references after cancellation attempt
+                state.interaction_task = None
+                state.queue_reader_task = None # Let it finish naturally
+                state.interaction_queue = None # Clear queue reference
 
                 # Send status based on whether we cancelled something
                 if interrupted_by_client:
@@ -316,47 +524,38 @@ async def websocket_endpoint(websocket: WebSocket):
                     # which handle_interaction_queue will send.
                     # Sending an immediate status might be redundant or confusing.
                     # Let's just confirm the stop was processed.
-                    await websocket.send_json({"type": "info", "message": "Stop command processed. Interaction cancelled."})
+                    await send_json(websocket, {"type": "info", "message": "Stop command processed. Interaction cancelled."})
                     # Optional: Send Idle state if confident cancellation worked immediately
-                    # await websocket.send_json({"type": "status", "state": "Idle", "message": "Stopped by client."}) 
+                    # await send_json(websocket, {"type": "status", "state": "Idle", "message": "Stopped by client."}) 
                 else:
-                     await websocket.send_json({"type": "status", "state": "Idle", "message": "Stop command received, nothing active to stop."})
+                     await websocket.send_text(_STATUS_IDLE_NOTHING_TO_STOP)
 
 
             elif action == "send_text":
                 text = data.get("text")
-                if not text:
-                    await websocket.send_json({"type": "error", "message": "Received empty text for 'send_text' action.", "state": "Idle"})
+                # Validate before any state change so empty/whitespace messages cost a single frame
+                if not isinstance(text, str) or not text.strip():
+                    await send_json(websocket, {"type": "error", "message": "Received empty text for 'send_text' action.", "state": "Idle"})
                     continue
 
                 print(f"Received 'send_text': '{text[:50]}...'")
                 
-                if current_interaction_task and not current_interaction_task.done():
-                    await websocket.send_json({"type": "error", "message": "Cannot send text while voice interaction is active.", "state": "Busy"})
-                    continue
-
-                await websocket.send_json({"type": "status", "state": "Processing"})
-                try:
-                    if not hasattr(alpaca_instance, 'interaction_handler'):
-                        raise AttributeError("Alpaca instance lacks an 'interaction_handler'")
-                    response_generator = await alpaca_instance.interaction_handler.run_single_text_interaction(text)
-                    full_response = ""
-                    for chunk in response_generator:
-                        if chunk:
-                            full_response += chunk
-                            await websocket.send_json({"type": "llm_chunk", "text": chunk})
-                        await asyncio.sleep(0)
-                    await websocket.send_json({"type": "status", "state": "Idle", "final_response": full_response})
-                    print("Text interaction streaming complete.")
-                except AttributeError as ae:
-                     print(f"Error accessing interaction handler: {ae}")
-                     traceback.print_exc()
-                     await websocket.send_json({"type": "error", "message": f"Server configuration error: {ae}", "state": "Error"})
-                except Exception as e:
-                    print(f"Error during text interaction: {e}")
-                    traceback.print_exc()
-                    await websocket.send_json({"type": "error", "message": f"Error processing text: {e}", "state": "Error"})
-                    await websocket.send_json({"type": "status", "state": "Idle"})
+                if state.is_busy():
+                    if state.interaction_kind != "text":
+                        await send_json(websocket, {"type": "error", "message": "Cannot send text while another interaction is active.", "state": "Busy"})
+                        continue
+                    # At most one text interaction per client: the newest message replaces the one in flight
+                    print("Cancelling previous text interaction in favour of the new message.")
+                    state.interaction_task.cancel()
+                    await asyncio.wait((state.interaction_task,))
+
+                # Run as a task so the receive loop keeps handling 'stop' and notices disconnects mid-stream.
+                # If another client holds the assistant, the task waits its turn.
+                state.interaction_task = asyncio.create_task(
+                    run_text_interaction(websocket, text),
+                    name=f"TextInteraction_{client_address}"
+                )
+                state.interaction_kind = "text"
 
 
             elif action == "interrupt":
@@ -380,9 +579,9 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Send confirmation back to client
                 if interrupted_tts:
                     # The actual status change (Interrupted, Idle) will come via the queue later
-                    await websocket.send_json({"type": "info", "message": "Interrupt signal sent to TTS handler."})
+                    await send_json(websocket, {"type": "info", "message": "Interrupt signal sent to TTS handler."})
                 else:
-                    await websocket.send_json({"type": "info", "message": "Interrupt received, but TTS handler could not be signalled."})
+                    await send_json(websocket, {"type": "info", "message": "Interrupt received, but TTS handler could not be signalled."})
 
 
             elif action == "toggle_vad_interrupt":
@@ -392,41 +591,31 @@ async def websocket_endpoint(websocket: WebSocket):
                 print(f"Received 'toggle_vad_interrupt', enabled: {enabled} (Logic not fully implemented)")
                 # Example: Store state per connection if managing multiple clients
                 # connection_state['vad_enabled'] = enabled
-                await websocket.send_json({"type": "info", "message": f"VAD Interrupt Toggled: {enabled} (Server logic TBD)"})
+                await send_json(websocket, {"type": "info", "message": f"VAD Interrupt Toggled: {enabled} (Server logic TBD)"})
 
             else:
                 print(f"Unknown action received: {action}")
-                await websocket.send_json({"type": "error", "message": f"Unknown action: {action}"})
+                await send_json(websocket, {"type": "error", "message": f"Unknown action: {action}"})
             # --- End Action Handling ---
 
     except WebSocketDisconnect:
         print(f"WebSocket disconnected from {client_address}.")
         # Clean up tasks associated with this connection
-        if current_interaction_task and not current_interaction_task.done():
+        if state.is_busy():
             print("Cancelling interaction task due to disconnect.")
-            current_interaction_task.cancel()
-        if queue_reader_task and not queue_reader_task.done():
-            print("Cancelling queue reader task due to disconnect.")
-            queue_reader_task.cancel()
-        current_interaction_task = None
-        queue_reader_task = None
-        interaction_queue = None
+        await connection_manager.cancel_tasks(client_id)
 
     except Exception as e:
         print(f"Error in WebSocket handler for {client_address}: {e}")
-        traceback.print_exc()
+        _print_traceback()
         try:
-            await websocket.send_json({"type": "error", "message": f"Server error: {e}", "state": "Error"})
+            await send_json(websocket, {"type": "error", "message": f"Server error: {e}", "state": "Error"})
             await websocket.close(code=1011)
         except Exception:
             pass # Ignore if sending/closing fails
     finally:
         # Ensure cleanup if connection closes unexpectedly
-        if current_interaction_task and not current_interaction_task.done(): current_interaction_task.cancel()
-        if queue_reader_task and not queue_reader_task.done(): queue_reader_task.cancel()
-        current_interaction_task = None
-        queue_reader_task = None
-        interaction_queue = None
+        await connection_manager.disconnect(client_id)
         print(f"WebSocket cleanup complete for {client_address}.")
 
 # --- Optional: Add entry point for running with uvicorn ---
@@ -440,4 +629,5 @@ if __name__ == "__main__":
     # uvicorn.run("server:app", ...) should be uvicorn.run(__name__ + ":app", ...) or adjust depending on execution context
     # Let's make it runnable directly assuming file is run from project root with PYTHONPATH set
     # Or more robustly: uvicorn src.api.server:app --host 127.0.0.1 --port 8000 --reload --log-level info
-    uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info") # Removed reload for direct run 
\ No newline at end of file
+    # Clients only send small JSON actions, so cap frame size and the per-connection receive queue
+    uvicorn.run(app, host="127.0.0.1", port=8000, log_level="info", ws_max_size=1 << 20, ws_max_queue=16) # Removed reload for direct run 
\ No newline at end of file
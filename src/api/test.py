@@ -1,17 +1,31 @@
 import asyncio
 import websockets
 import json
-import base64
-import numpy as np
 import sounddevice as sd
 import traceback
 
+def _close_output_stream(stream, drain=True):
+    """Stops and closes a RawOutputStream. drain=True lets queued audio finish; False drops it (interrupts)."""
+    if stream is None:
+        return
+    try:
+        if drain:
+            stream.stop() # Returns once buffered audio has played
+        else:
+            stream.abort()
+        stream.close()
+    except Exception as e:
+        print(f"    Error closing output stream: {e}")
+
 async def test_interaction(mode="text", text_to_send=None):
     uri = "ws://localhost:8000/ws" # Make sure the port matches your uvicorn command
     audio_buffer = [] # Buffer to store incoming audio chunks
     sample_rate = 16000 # Default sample rate, update if received
-    audio_format = 'int16' # Default format based on pcm_s16le
+    audio_format = 'int16' # Default format based on pcm_s16le; updated by each audio_header
     playback_interrupted = False # Flag to stop playback on interrupt
+    # One persistent stream for all chunks; sd.play/sd.wait per chunk rebuilt the PortAudio stream and left gaps
+    output_stream = None
+    output_stream_config = None # (sample_rate, dtype) the stream was opened with
 
     print(f"--- Testing {mode.upper()} mode ---")
     if mode == "text" and not text_to_send:
@@ -64,6 +78,25 @@ async def test_interaction(mode="text", text_to_send=None):
                             continue # Ignore non-json after interrupt
                     # -------------------------------------------------
 
+                    # --- Binary frames carry raw PCM described by the preceding audio_header ---
+                    if isinstance(response, (bytes, bytearray)):
+                        try:
+                            stream_config = (sample_rate, audio_format)
+                            # Reopen only when the sample rate or format changes
+                            if output_stream is None or output_stream_config != stream_config:
+                                _close_output_stream(output_stream)
+                                output_stream = sd.RawOutputStream(samplerate=sample_rate, channels=1, dtype=audio_format)
+                                output_stream.start()
+                                output_stream_config = stream_config
+                            print(f"< Received {len(response)} audio bytes, queueing at {sample_rate} Hz...")
+                            # Blocks only while the device buffer is full, so chunks play back to back
+                            output_stream.write(response)
+                        except Exception as play_e:
+                            print(f"    Error playing audio chunk: {play_e}")
+                            traceback.print_exc()
+                        continue
+                    # -------------------------------------------------
+
                     print(f"< Received raw: {response[:100]}...") # Print truncated raw response
 
                     try:
@@ -80,56 +113,32 @@ async def test_interaction(mode="text", text_to_send=None):
                             interrupt_sent = True
                         # ----------------------------------------------------------
 
-                        if msg_type == "audio_chunk":
-                            # --- Check interrupt flag before playing --- 
-                            if playback_interrupted:
-                                print("    Skipping audio chunk due to prior interrupt.")
-                                continue
-                            # -----------------------------------------
-                            
-                            base64_audio = data.get("data")
+                        if msg_type == "audio_header":
                             received_rate = data.get("sample_rate")
                             received_format = data.get("format", "pcm_s16le").lower()
 
                             if received_rate:
                                 sample_rate = int(received_rate)
                             
-                            # Determine numpy dtype based on format
-                            dtype = np.int16 # Default for pcm_s16le
+                            # Determine sample dtype based on format
+                            audio_format = 'int16' # Default for pcm_s16le
                             if "f32" in received_format: # Example check for float32
-                                dtype = np.float32
-                                print(f"    (Audio format: {dtype})")
+                                audio_format = 'float32'
+                                print(f"    (Audio format: {audio_format})")
                             # Add more checks if other formats are possible
-
-                            if base64_audio:
-                                try:
-                                    audio_bytes = base64.b64decode(base64_audio)
-                                    # Convert bytes to numpy array
-                                    audio_array = np.frombuffer(audio_bytes, dtype=dtype)
-                                    print(f"    Decoded {len(audio_bytes)} audio bytes, playing {len(audio_array)} samples at {sample_rate} Hz...")
-                                    sd.play(audio_array, samplerate=sample_rate)
-                                    # --- Wait for playback to finish before processing next message --- 
-                                    print("    Waiting for chunk playback to complete...")
-                                    sd.wait() 
-                                    print("    Playback complete.")
-                                    # --- End wait ---
-
-                                except base64.binascii.Error as b64e:
-                                     print(f"    Error decoding base64: {b64e}")
-                                except Exception as play_e:
-                                     print(f"    Error playing audio chunk: {play_e}")
-                                     traceback.print_exc()
                         
                         elif msg_type == "status":
                             if state == "Interrupted":
                                 print("<- INTERRUPT received! Stopping playback and ignoring further audio.")
                                 playback_interrupted = True
-                                sd.stop() # Stop current playback immediately
+                                _close_output_stream(output_stream, drain=False) # Stop current playback immediately
+                                output_stream = None
                                 # Don't break yet, wait for final Idle/Error/Cancelled from QueueReader exit
                             
                             elif state in ["Idle", "Error", "Cancelled", "Disabled"]:
                                 print(f"<- Received final state '{state}'. Waiting for audio playback...")
-                                sd.wait() # Wait for any audio *already playing* to finish
+                                _close_output_stream(output_stream) # Wait for any audio *already queued* to finish
+                                output_stream = None
                                 print("<- Playback finished. Closing connection.")
                                 break # Exit loop
                             
@@ -138,7 +147,7 @@ async def test_interaction(mode="text", text_to_send=None):
                                 print(f"< Received JSON: {data}") 
 
                         # Print other message types like transcripts etc.
-                        elif msg_type != "audio_chunk" and msg_type != "status": 
+                        elif msg_type != "audio_header" and msg_type != "status": 
                              print(f"< Received JSON: {data}") 
 
                     except json.JSONDecodeError:
@@ -149,10 +158,12 @@ async def test_interaction(mode="text", text_to_send=None):
 
             except websockets.exceptions.ConnectionClosedOK:
                 print("< Connection closed normally.")
-                sd.wait() # Ensure audio finishes if connection closed mid-stream
+                _close_output_stream(output_stream) # Ensure audio finishes if connection closed mid-stream
+                output_stream = None
             except websockets.exceptions.ConnectionClosedError as e:
                 print(f"< Connection closed with error: {e}")
-                sd.wait()
+                _close_output_stream(output_stream)
+                output_stream = None
 
     except ConnectionRefusedError:
         print(f"Error: Connection refused. Is the server running at {uri}?")
@@ -161,7 +172,7 @@ async def test_interaction(mode="text", text_to_send=None):
         traceback.print_exc()
     finally:
         print("Stopping any lingering audio playback...")
-        sd.stop()
+        _close_output_stream(output_stream, drain=False)
 
 if __name__ == "__main__":
     # Ensure the server is running before executing this script
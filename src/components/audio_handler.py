@@ -10,17 +10,42 @@ import sounddevice as sd
 import soundfile as sf
 import io
 import os
-import math # Added for RMS calculation
+import contextlib
 
 from .audio_player import AudioPlayer
 from .interrupt_detector import InterruptDetector
 
+# PortAudio is initialized once per process and shared by every AudioHandler; terminated when the last one is released
+_PYAUDIO_INSTANCE = None
+_PYAUDIO_REFS = 0
+_PYAUDIO_LOCK = threading.Lock()
+
+def _acquire_pyaudio():
+    """Returns the shared PyAudio instance, creating it on first use."""
+    global _PYAUDIO_INSTANCE, _PYAUDIO_REFS
+    with _PYAUDIO_LOCK:
+        if _PYAUDIO_INSTANCE is None:
+            _PYAUDIO_INSTANCE = pyaudio.PyAudio()
+        _PYAUDIO_REFS += 1
+        return _PYAUDIO_INSTANCE
+
+def _release_pyaudio():
+    """Drops one reference to the shared PyAudio instance and terminates it when none remain."""
+    global _PYAUDIO_INSTANCE, _PYAUDIO_REFS
+    with _PYAUDIO_LOCK:
+        if _PYAUDIO_REFS == 0:
+            return
+        _PYAUDIO_REFS -= 1
+        if _PYAUDIO_REFS == 0 and _PYAUDIO_INSTANCE is not None:
+            _PYAUDIO_INSTANCE.terminate()
+            _PYAUDIO_INSTANCE = None
+
 class AudioHandler:
     def __init__(self, config=None):
         self.config = config or {}
         self.audio_validation = self.config.get('audio_validation', {})
         self.recognizer_config = self.config.get('recognizer', {})
-        self.pyaudio_instance = pyaudio.PyAudio()
+        self.pyaudio_instance = _acquire_pyaudio()
 
         player_config = {
             'default_sample_rate': self.config.get('tts_sample_rate', 22050) # Example config key
@@ -47,14 +72,73 @@ class AudioHandler:
         self.max_retries = self.audio_validation.get('max_retries', 3)
         self.min_energy = self.audio_validation.get('min_energy', 100) # Provide a default min energy
         self.max_phrase_duration = self.audio_validation.get('max_phrase_duration', 300) # 5 minutes default
+        # Ambient calibration samples the mic for up to a second; reuse its result for this many seconds
+        self.ambient_recalibrate_interval = self.audio_validation.get('ambient_recalibrate_interval', 60)
+        self._ambient_threshold = None
+        self._ambient_calibrated_at = 0.0
+        # Keep one microphone stream open across listens instead of reopening PortAudio every turn.
+        # Off by default: the stream stays open while the interrupt detector opens its own, which some devices refuse.
+        self.keep_microphone_open = self.recognizer_config.get('keep_microphone_open', False)
+        self._mic = None
+        self._mic_source = None
 
     # --- Property for Playback Status ---
     @property
     def is_playing(self):
         return self.player.is_playing
 
+    # --- Microphone ---
+    @contextlib.contextmanager
+    def _microphone(self):
+        """Yields an open microphone source: a fresh one per listen, or the long-lived one if keep_microphone_open."""
+        if not self.keep_microphone_open:
+            # Use the VAD sample rate for the microphone to ensure compatibility
+            with sr.Microphone(sample_rate=self.detector.vad_sample_rate) as source:
+                yield source
+            return
+
+        if self._mic_source is None:
+            self._mic = sr.Microphone(sample_rate=self.detector.vad_sample_rate)
+            self._mic_source = self._mic.__enter__()
+        else:
+            self._discard_buffered_input()
+        try:
+            yield self._mic_source
+        except OSError:
+            # A failed read can leave the stream unusable; reopen on the next listen
+            self._close_microphone()
+            raise
+
+    def _discard_buffered_input(self):
+        """Drops audio captured since the last listen (e.g. our own TTS output) from the open stream."""
+        try:
+            pyaudio_stream = self._mic_source.stream.pyaudio_stream
+            available = pyaudio_stream.get_read_available()
+            if available > 0:
+                pyaudio_stream.read(available, exception_on_overflow=False)
+        except Exception as e:
+            print(f"Error flushing microphone buffer, reopening: {e}")
+            self._close_microphone()
+            self._mic = sr.Microphone(sample_rate=self.detector.vad_sample_rate)
+            self._mic_source = self._mic.__enter__()
+
+    def _close_microphone(self):
+        """Closes the long-lived microphone stream, if open."""
+        mic, self._mic, self._mic_source = self._mic, None, None
+        if mic is not None:
+            try:
+                mic.__exit__(None, None, None)
+            except Exception as e:
+                print(f"Error closing microphone: {e}")
+
+    @staticmethod
+    def _retry_backoff(retry_count):
+        """Seconds to wait before listen retry number retry_count (1-based): 0.5, 1.0, then capped at 1.0."""
+        return min(1.0, 0.25 * 2 ** retry_count)
+
     # --- Core Listening Method ---
     def listen_for_speech(self, filename="prompt.wav", timeout=None, stop_playback=False):
+        """Blocking: records one phrase to a WAV file. Call from a worker thread (AlpacaInteraction runs it via asyncio.to_thread)."""
         if stop_playback:
             try:
                 self.stop_playback()
@@ -75,11 +159,18 @@ class AudioHandler:
             retry_count = 0
             while retry_count <= self.max_retries:
                 try:
-                    # Use the VAD sample rate for the microphone to ensure compatibility
-                    with sr.Microphone(sample_rate=self.detector.vad_sample_rate) as source:
-                        duration = 1.0 if retry_count == 0 else 0.5
-                        print(f"Adjusting for ambient noise ({duration}s)...")
-                        self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+                    with self._microphone() as source:
+                        calibration_age = time.monotonic() - self._ambient_calibrated_at
+                        # Retries always recalibrate: they usually follow a low-energy or failed capture
+                        if retry_count == 0 and self._ambient_threshold is not None and calibration_age < self.ambient_recalibrate_interval:
+                            self.recognizer.energy_threshold = self._ambient_threshold
+                            print(f"Using ambient calibration from {calibration_age:.0f}s ago (threshold {self._ambient_threshold:.2f}).")
+                        else:
+                            duration = 1.0 if retry_count == 0 else 0.5
+                            print(f"Adjusting for ambient noise ({duration}s)...")
+                            self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+                            self._ambient_threshold = self.recognizer.energy_threshold
+                            self._ambient_calibrated_at = time.monotonic()
 
                         print(f"Listening with timeout={timeout if timeout else 5} seconds, phrase limit={self.max_phrase_duration}s...")
                         audio_data = self.recognizer.listen(
@@ -96,7 +187,7 @@ class AudioHandler:
                            if retry_count < self.max_retries:
                                 print(f"Retrying listen due to low ambient energy (attempt {retry_count + 1}/{self.max_retries})...")
                                 retry_count += 1
-                                time.sleep(0.5) # Small delay before retry
+                                time.sleep(self._retry_backoff(retry_count)) # Small delay before retry
                                 continue
                            else:
                                 return "low_energy"
@@ -105,8 +196,13 @@ class AudioHandler:
                         wav_filename = filename if filename.endswith('.wav') else f"{filename}.wav"
                         filepath = os.path.abspath(wav_filename)
                         print(f"Saving audio to {filepath}...")
-                        with open(filepath, "wb") as f:
-                            f.write(audio_data.get_wav_data())
+                        # Write the captured PCM straight into the WAV container; get_wav_data() would
+                        # first build the whole file as a second in-memory copy
+                        with wave.open(filepath, "wb") as wav_file:
+                            wav_file.setnchannels(1)
+                            wav_file.setsampwidth(audio_data.sample_width)
+                            wav_file.setframerate(audio_data.sample_rate)
+                            wav_file.writeframes(audio_data.get_raw_data()) # No conversion requested, so no copy
                         print(f"Audio saved successfully.")
                         return filepath
 
@@ -125,7 +221,7 @@ class AudioHandler:
                     if retry_count < self.max_retries:
                         print(f"Retrying listen due to error (attempt {retry_count + 1}/{self.max_retries})...")
                         retry_count += 1
-                        time.sleep(1) # Longer delay after error
+                        time.sleep(self._retry_backoff(retry_count)) # Back off before retrying after an error
                         continue
                     return None # General error after retries
 
@@ -166,20 +262,30 @@ class AudioHandler:
         self.detector.stop_interrupt_listener() # Ensure detector is stopped too
 
     # --- Cleanup Method ---
-    def __del__(self):
-        """Cleanup resources for player, detector, and PyAudio."""
+    def cleanup(self):
+        """Stop player and detector threads and release PyAudio. Safe to call more than once."""
+        if getattr(self, '_cleaned_up', False):
+            return
+        self._cleaned_up = True
         try:
+            if getattr(self, '_mic', None) is not None:
+                self._close_microphone()
             if hasattr(self, 'player') and self.player:
                 self.player.cleanup()
             if hasattr(self, 'detector') and self.detector:
                 self.detector.cleanup()
 
-            if hasattr(self, 'pyaudio_instance') and self.pyaudio_instance:
-                time.sleep(0.2)
-                self.pyaudio_instance.terminate()
+            if getattr(self, 'pyaudio_instance', None):
+                # Player and detector threads have been joined above, so no stream is still in use
+                self.pyaudio_instance = None
+                _release_pyaudio()
 
         except Exception as e:
             print(f"Error during AudioHandler cleanup: {e}")
             traceback.print_exc()
         finally:
-             print("AudioHandler cleanup finished.") 
\ No newline at end of file
+             print("AudioHandler cleanup finished.")
+
+    def __del__(self):
+        """Cleanup resources for player, detector, and PyAudio."""
+        self.cleanup()
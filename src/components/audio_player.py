@@ -4,6 +4,14 @@ import threading
 import time
 import numpy as np
 
+# Short TTS chunks are merged until this much audio is ready, so each write keeps the device buffer fed
+COALESCE_SECONDS = 0.05
+
+def _pcm_view(audio_data):
+    """Read-only byte view of a contiguous float32 array for stream.write(), without the tobytes() copy."""
+    # Read-only because PyAudio parses the buffer as s#
+    return memoryview(audio_data).cast('B').toreadonly()
+
 class AudioPlayer:
     def __init__(self, pyaudio_instance, default_sample_rate=22050):
         self.pyaudio = pyaudio_instance
@@ -14,19 +22,38 @@ class AudioPlayer:
         self.should_stop_playback = threading.Event()
         self.total_audio_duration = 0.0
         self.last_audio_timestamp = 0.0
+        self._output_latency = 0.0 # Device buffer length of the open stream, in seconds
+        self._scratch = None # Reused buffer for coalesced chunks, grown on demand
 
     def play_audio(self, audio_data, sample_rate=None):
         if sample_rate is None:
             sample_rate = self.default_sample_rate
 
-        if hasattr(audio_data, 'detach') and hasattr(audio_data, 'cpu') and hasattr(audio_data, 'numpy'):
-            audio_data = audio_data.detach().cpu().numpy()
-
-        if audio_data.dtype != np.float32:
-            audio_data = audio_data.astype(np.float32)
-
-        if np.max(np.abs(audio_data)) > 1.0:
-            audio_data = audio_data / np.max(np.abs(audio_data))
+        is_tensor = hasattr(audio_data, 'detach') and hasattr(audio_data, 'cpu') and hasattr(audio_data, 'numpy')
+        if is_tensor:
+            audio_data = audio_data.detach()
+            # Normalize on the tensor's own device (GPU/MPS when TTS ran there) before the copy to host
+            if audio_data.numel():
+                peak = audio_data.abs().amax()
+                if peak.item() > 1.0:
+                    audio_data = audio_data / peak
+            audio_data = audio_data.float().cpu().numpy()
+
+        # No copy when TTS already produced contiguous float32; the playback thread writes this buffer as-is
+        source = audio_data
+        audio_data = np.ascontiguousarray(audio_data, dtype=np.float32)
+
+        if audio_data.size and not is_tensor:
+            # Peak from two reductions instead of materializing |x| twice
+            peak = max(float(audio_data.max()), -float(audio_data.min()))
+            if peak > 1.0:
+                scale = np.float32(1.0 / peak)
+                if audio_data is not source:
+                    # The conversion above produced a private buffer, so scale it in place
+                    np.multiply(audio_data, scale, out=audio_data)
+                else:
+                    # Still the caller's (or a tensor's) memory; don't modify it
+                    audio_data = audio_data * scale
 
         audio_duration = len(audio_data) / sample_rate
 
@@ -51,11 +78,17 @@ class AudioPlayer:
     def _audio_playback_thread(self):
         stream = None
         current_sample_rate = self.default_sample_rate # Initialize with default
+        pending = None # Chunk taken while coalescing that has a different sample rate
         try:
             while not self.should_stop_playback.is_set():
+                chunk_count = 0 # Queue items taken this iteration and not yet marked done
                 try:
                     # Get audio from queue with a timeout
-                    audio_data, sample_rate = self.audio_queue.get(timeout=0.5)
+                    if pending is not None:
+                        (audio_data, sample_rate), pending = pending, None
+                    else:
+                        audio_data, sample_rate = self.audio_queue.get(timeout=0.5)
+                    chunk_count = 1
 
                     # Set playing flag to true
                     self.is_playing = True
@@ -65,6 +98,27 @@ class AudioPlayer:
                         self.audio_queue.task_done()
                         break
 
+                    # Merge already-queued short chunks of the same rate into one write
+                    target_frames = int(sample_rate * COALESCE_SECONDS)
+                    if len(audio_data) < target_frames and self.audio_queue.qsize():
+                        chunks = [audio_data]
+                        total_frames = len(audio_data)
+                        while total_frames < target_frames:
+                            try:
+                                next_chunk = self.audio_queue.get_nowait()
+                            except queue.Empty:
+                                break
+                            if next_chunk[1] != sample_rate:
+                                pending = next_chunk
+                                break
+                            chunks.append(next_chunk[0])
+                            total_frames += len(next_chunk[0])
+                        chunk_count = len(chunks)
+                        if chunk_count > 1:
+                            if self._scratch is None or self._scratch.size < total_frames:
+                                self._scratch = np.empty(max(total_frames, 2 * target_frames), dtype=np.float32)
+                            audio_data = np.concatenate(chunks, out=self._scratch[:total_frames])
+
                     # Create or recreate stream if needed or if sample rate changes
                     if stream is None or sample_rate != current_sample_rate:
                         if stream:
@@ -77,18 +131,27 @@ class AudioPlayer:
                             output=True
                         )
                         current_sample_rate = sample_rate
+                        try:
+                            self._output_latency = stream.get_output_latency()
+                        except Exception:
+                            self._output_latency = 0.0
 
                     playback_duration = len(audio_data) / sample_rate
 
                     # Play audio
                     try:
-                        stream.write(audio_data.tobytes())
+                        stream.write(_pcm_view(audio_data), num_frames=len(audio_data))
                         # Update tracking - subtract the duration of audio just played
                         self.total_audio_duration = max(0.0, self.total_audio_duration - playback_duration)
                     except Exception as e:
                         print(f"Error writing to audio stream: {e}")
                     finally:
-                        self.audio_queue.task_done()
+                        if self.audio_queue.qsize() == 0 and pending is None:
+                            self.is_playing = False
+                        # Wakes wait_for_playback_complete() once the last queued chunk is written
+                        for _ in range(chunk_count):
+                            self.audio_queue.task_done()
+                        chunk_count = 0
 
 
                 except queue.Empty:
@@ -99,13 +162,15 @@ class AudioPlayer:
                     continue
                 except Exception as e:
                     print(f"Error in audio playback thread: {e}")
-                    if self.audio_queue.unfinished_tasks > 0:
+                    for _ in range(chunk_count):
                         try:
                             self.audio_queue.task_done()
                         except ValueError: # Can happen if task_done() called too many times
-                             pass
+                             break
 
         finally:
+            if pending is not None:
+                self.audio_queue.task_done()
             if stream is not None:
                 try:
                     stream.stop_stream()
@@ -124,44 +189,33 @@ class AudioPlayer:
         Returns:
             bool: True if playback completed, False if timed out
         """
-        if not self.is_playing and self.audio_queue.empty():
+        if not self.is_playing and self.audio_queue.unfinished_tasks == 0:
             self.total_audio_duration = 0.0
             return True
 
+        estimated_remaining = self.total_audio_duration
         # Calculate dynamic timeout if not provided
         if timeout is None:
             # Base timeout on total audio duration plus buffer
             # Formula: audio_duration * 1.5 + 2.0 seconds (min 5 seconds, max 60 seconds)
-            estimated_remaining = self.total_audio_duration
             timeout = min(max(estimated_remaining * 1.5 + 2.0, 5.0), 60.0)
 
         print(f"Waiting for audio playback to complete (timeout: {timeout:.1f}s, estimated remaining: {estimated_remaining:.1f}s)...")
 
-        start_time = time.time()
-
-        queue_empty_time = None
-        while not self.audio_queue.empty() and (time.time() - start_time) < timeout:
-            time.sleep(0.1)
-        if self.audio_queue.empty():
-             queue_empty_time = time.time()
-
-        while self.is_playing and (time.time() - start_time) < timeout:
-            time.sleep(0.1)
+        # Sleep on the queue's own condition; task_done() in the playback thread wakes us, no polling
+        all_tasks_done = self.audio_queue.all_tasks_done
+        with all_tasks_done:
+            drained = all_tasks_done.wait_for(lambda: self.audio_queue.unfinished_tasks == 0, timeout=timeout)
 
-        # Add a small buffer wait after is_playing is false, ensures the last chunk finishes
-        if not self.is_playing:
-             buffer_wait_start = time.time()
-             buffer_wait_duration = min(1.0, estimated_remaining * 0.1 + 0.2)
-             while (time.time() - buffer_wait_start) < buffer_wait_duration and (time.time() - start_time) < timeout:
-                  time.sleep(0.05)
-             print(f"Buffer wait complete ({buffer_wait_duration:.2f}s). Queue empty at: {queue_empty_time - start_time if queue_empty_time else 'N/A':.2f}s, Playing flag false at: {time.time() - buffer_wait_start - start_time:.2f}s")
-
-
-        if time.time() - start_time >= timeout:
+        if not drained:
             print(f"Warning: Timed out waiting for audio playback to complete after {timeout:.1f}s")
             self.stop_playback(force=True) # Force stop on timeout
             return False
 
+        # The last write returns once PortAudio has the data; let the device play out its buffer
+        if self._output_latency > 0:
+            time.sleep(min(self._output_latency, 0.5))
+
         self.is_playing = False
         self.total_audio_duration = 0.0
         return True
@@ -1,22 +1,53 @@
+import os
 import pyaudio
+import queue
 import threading
 import time
 import numpy as np
 import math
 import torch
 
+try:
+    from silero_vad import load_silero_vad, get_speech_timestamps, save_audio, read_audio, VADIterator, collect_chunks
+except ImportError:
+    load_silero_vad = None
+
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+# Captured chunks the listener may fall behind by (~1 s at 512 samples / 16 kHz) before the oldest are dropped
+_INPUT_QUEUE_CHUNKS = 32
+
+def _load_hub_vad():
+    """Loads Silero VAD via torch.hub, from the local hub checkout when one exists."""
+    # torch.hub checks GitHub on every load even when cached; a local load only reads the checkout
+    cached_repo = os.path.join(torch.hub.get_dir(), 'snakers4_silero-vad_master')
+    if os.path.isfile(os.path.join(cached_repo, 'hubconf.py')):
+        try:
+            return torch.hub.load(repo_or_dir=cached_repo, model='silero_vad', source='local')
+        except Exception as e:
+            print(f"Could not load cached Silero VAD checkout ({e}); fetching from torch.hub.")
+    # Use force_reload=True if you want to ensure the latest version
+    return torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad', force_reload=False)
+
 class InterruptDetector:
     def __init__(self, pyaudio_instance, config):
         self.pyaudio = pyaudio_instance
         self.config = config
 
         # --- Silero VAD Setup ---
+        # Prefer the pip silero-vad package's ONNX build (runs on onnxruntime, no hub download
+        # or network round-trip at startup); fall back to the torch.hub JIT model
+        self.vad_model = None
+        self.vad_utils = None
         try:
-            # Use force_reload=True if you want to ensure the latest version
-            self.vad_model, self.vad_utils = torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad', force_reload=False)
+            if load_silero_vad is not None:
+                self.vad_model = load_silero_vad(onnx=True)
+                self.vad_utils = (get_speech_timestamps, save_audio, read_audio, VADIterator, collect_chunks)
+                print("Silero VAD model loaded successfully (ONNX).")
+            else:
+                self.vad_model, self.vad_utils = _load_hub_vad()
+                self.vad_model.eval() # Set model to evaluation mode
+                print("Silero VAD model loaded successfully.")
             (self.get_speech_timestamps, self.save_audio, self.read_audio, self.VADIterator, self.collect_chunks) = self.vad_utils
-            self.vad_model.eval() # Set model to evaluation mode
-            print("Silero VAD model loaded successfully.")
         except Exception as e:
             print(f"Error loading Silero VAD model: {e}. Interrupt detection might be less accurate.")
             self.vad_model = None
@@ -29,6 +60,10 @@ class InterruptDetector:
         # Silero VAD requires specific chunk sizes: 512 samples for 16kHz
         self.chunk = 512 
         self.format = pyaudio.paInt16 # VAD works on int16
+        # Reused VAD input: every captured chunk is self.chunk samples, so convert into one buffer
+        # and keep a tensor sharing its memory instead of allocating both per call
+        self._vad_input = np.empty(self.chunk, dtype=np.float32)
+        self._vad_input_tensor = torch.from_numpy(self._vad_input)
 
         # --- VAD/Energy Parameters from Config ---
         # Use get with defaults for robustness
@@ -45,14 +80,17 @@ class InterruptDetector:
     def _calculate_rms(self, data):
         """Calculate Root Mean Square of audio data (int16 numpy array)."""
         try:
-            data = data.astype(np.int16)
+            # No copy when the caller already passes int16 (np.frombuffer of the stream read)
+            data = np.asarray(data, dtype=np.int16)
         except ValueError:
             print("Warning: Could not convert audio data to int16 for RMS calculation.")
             return 0
         if data.size == 0:
             return 0
-        # Use float64 for intermediate calculation to avoid overflow
-        rms = math.sqrt(np.mean(np.square(data.astype(np.float64))))
+        # float32 holds every int16 exactly and its BLAS dot() sums the squares without a squared
+        # temporary, at half the float64 traffic. An int32 dot would overflow (512 * 32768**2 > 2**31)
+        samples = data.astype(np.float32)
+        rms = math.sqrt(float(np.dot(samples, samples)) / samples.size)
         return rms
 
     def _process_vad(self, audio_chunk_int16):
@@ -61,38 +99,84 @@ class InterruptDetector:
             return 0.0 # Return 0 confidence if VAD model failed to load
 
         try:
-            # Convert int16 numpy array to float32 tensor expected by VAD
-            audio_float32 = audio_chunk_int16.astype(np.float32) / 32768.0
-            audio_tensor = torch.from_numpy(audio_float32)
-
-            # Get speech probability
-            speech_prob = self.vad_model(audio_tensor, self.vad_sample_rate).item()
+            # Convert int16 to the float32 [-1, 1) tensor VAD expects in one pass: the ufunc casts
+            # while scaling, with no intermediate float array. The result is writable, so from_numpy
+            # shares it without copying (the read-only frombuffer input would trigger a warning)
+            if audio_chunk_int16.size == self._vad_input.size:
+                np.multiply(audio_chunk_int16, _INT16_SCALE, out=self._vad_input)
+                audio_tensor = self._vad_input_tensor
+            else:
+                audio_float32 = np.multiply(audio_chunk_int16, _INT16_SCALE, dtype=np.float32)
+                audio_tensor = torch.from_numpy(audio_float32)
+
+            # Get speech probability; inference_mode skips autograd bookkeeping for the JIT model
+            # (grad mode is per-thread, so it has to be set here on the listener thread)
+            with torch.inference_mode():
+                speech_prob = self.vad_model(audio_tensor, self.vad_sample_rate).item()
             return speech_prob
         except Exception as e:
             print(f"Error during VAD processing: {e}")
             return 0.0 # Return 0 confidence on error
 
+    def _reset_vad_state(self):
+        """Clears the Silero model's recurrent state (both the ONNX wrapper and the JIT model expose reset_states)."""
+        reset_states = getattr(self.vad_model, 'reset_states', None)
+        if reset_states is not None:
+            try:
+                reset_states()
+            except Exception as e:
+                print(f"Error resetting VAD state: {e}")
+
     def _interrupt_listener_run(self):
         """Background thread to listen for user interruption via VAD and Energy."""
         print(f"Interrupt listener started (Rate: {self.vad_sample_rate} Hz, Chunk: {self.chunk}, Channels: {self.channels}).")
         stream = None
         active_chunks = 0
+        vad_state_fresh = True # Whether the VAD's recurrent state follows on from the previous chunk
+        captured_chunks = queue.Queue(maxsize=_INPUT_QUEUE_CHUNKS)
+
+        def on_audio(in_data, frame_count, time_info, status):
+            # PortAudio's thread only hands the buffer over, so a slow VAD call can't overflow the device
+            try:
+                captured_chunks.put_nowait(in_data)
+            except queue.Full:
+                # Listener fell behind; keep the newest audio, which is what an interrupt depends on
+                try:
+                    captured_chunks.get_nowait()
+                except queue.Empty:
+                    pass
+                captured_chunks.put_nowait(in_data)
+            return (None, pyaudio.paContinue)
+
         try:
             stream = self.pyaudio.open(format=self.format, # paInt16
                                        channels=self.channels, # Mono
                                        rate=self.vad_sample_rate, # 16000 Hz
                                        input=True,
-                                       frames_per_buffer=self.chunk)
+                                       frames_per_buffer=self.chunk,
+                                       stream_callback=on_audio)
 
             while not self.should_stop_interrupt_listener.is_set():
                 try:
-                    data = stream.read(self.chunk, exception_on_overflow=False)
+                    try:
+                        data = captured_chunks.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
                     # Get int16 numpy array from buffer
                     audio_chunk_int16 = np.frombuffer(data, dtype=np.int16)
 
                     rms = self._calculate_rms(audio_chunk_int16)
 
-                    speech_prob = self._process_vad(audio_chunk_int16)
+                    # Speech needs both energy and VAD confidence, so quiet chunks skip the model call
+                    if rms > self.vad_energy_threshold:
+                        if not vad_state_fresh:
+                            # Chunks were skipped since the last call; don't carry stale context over the gap
+                            self._reset_vad_state()
+                        speech_prob = self._process_vad(audio_chunk_int16)
+                        vad_state_fresh = True
+                    else:
+                        speech_prob = 0.0
+                        vad_state_fresh = False
 
                     is_speech_detected = (rms > self.vad_energy_threshold and speech_prob >= self.vad_confidence_threshold)
 
@@ -110,13 +194,6 @@ class InterruptDetector:
                         # Reset active chunks slightly to require sustained sound and prevent rapid re-triggering
                         active_chunks = self.vad_activation_chunks - 1
 
-                except IOError as e:
-                    if e.errno == pyaudio.paInputOverflowed:
-                        print("Input overflowed in interrupt listener. Skipping chunk.")
-                    else:
-                        print(f"IOError in interrupt listener: {e}")
-                        # Avoid busy-waiting on persistent IOErrors
-                        time.sleep(0.1)
                 except Exception as e:
                     print(f"Error in interrupt listener loop: {e}")
                     time.sleep(0.1)
@@ -168,5 +245,9 @@ class InterruptDetector:
 
     def cleanup(self):
         """Clean up resources, stop thread."""
+        listener_thread = self.interrupt_listener_thread
         self.stop_interrupt_listener()
+        # The listener polls its chunk queue every 100 ms, so it notices the stop event almost immediately
+        if listener_thread and listener_thread.is_alive():
+            listener_thread.join(timeout=0.5)
         print("InterruptDetector cleanup finished.") 
\ No newline at end of file
@@ -12,9 +12,12 @@ from minirag.llm.ollama import ollama_model_complete
 from indexer import *
 from config.personality_config import PERSONALITY_CORE
 from minirag.prompt import PROMPTS
-from utils.conversation_manager import format_timedelta
+from utils.conversation_manager import format_timedelta, is_summary_message
+from utils.config_loader import env_flag
 
 CONTEXT_LENGTH_LIMIT = int(os.getenv('CONTEXT_LENGTH_LIMIT', '5000'))
+# Summary files are named by save_summary() as summary_YYYYMMDD_HHMMSS.txt
+_SUMMARY_FILENAME_RE = re.compile(r'summary_(\d{8}_\d{6})\.txt')
 
 class LLMHandler:
     def __init__(self, config=None):
@@ -31,9 +34,7 @@ class LLMHandler:
             'repeat_penalty': local_config.get('repeat_penalty')
         }
         self.rag_querier = None
-        enable_rag_str = os.getenv('ENABLE_RAG', 'false')
-        cleaned_enable_rag_str = enable_rag_str.split('#')[0].strip().strip('"').strip("'").lower()
-        self.rag_enabled = cleaned_enable_rag_str == 'true'
+        self.rag_enabled = env_flag('ENABLE_RAG')
         self.base_data_path = os.getenv('DATA_PATH')
         if self.rag_enabled:
             self.working_dir = os.getenv('WORKING_DIR')
@@ -97,7 +98,7 @@ class LLMHandler:
             latest_summary_file = max(summary_files, key=lambda p: p.stat().st_mtime)
 
             # Extract timestamp from filename
-            match = re.search(r'summary_(\d{8}_\d{6})\.txt', latest_summary_file.name)
+            match = _SUMMARY_FILENAME_RE.search(latest_summary_file.name)
             if match:
                 timestamp_str = match.group(1)
                 last_interaction_time = datetime.strptime(timestamp_str, '%Y%m%d_%H%M%S')
@@ -141,7 +142,8 @@ class LLMHandler:
         )
 
         modified_messages = []
-        temp_messages = [m for m in messages if m['role'] != 'system']
+        # Drop the conversation's own system prompt (replaced by the personality) but keep compacted-history summaries
+        temp_messages = [m for m in messages if m['role'] != 'system' or is_summary_message(m)]
         modified_messages.append({'role': 'system', 'content': formatted_personality})
         modified_messages.extend(temp_messages)
 
@@ -152,9 +154,12 @@ class LLMHandler:
                 stream=True,
                 options=self.params
             )
+            # ollama>=0.4 yields pydantic ChatResponse objects; plain attribute access skips the
+            # dict-emulation __contains__/__getitem__ lookups on every token
             for chunk in response:
-                if 'message' in chunk and 'content' in chunk['message']:
-                    yield chunk['message']['content']
+                content = chunk.message.content
+                if content:
+                    yield content
         except Exception as e:
              print(f"\nError during Ollama chat with base model: {e}")
              traceback.print_exc()
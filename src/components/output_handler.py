@@ -6,13 +6,21 @@ import asyncio
 from asyncio import Queue
 import sys
 from typing import Optional
-import base64
+import re
 import numpy as np
 
 from utils.component_manager import ComponentManager
 from components.tts_handler import TTSHandler
 from components.audio_handler import AudioHandler
 
+# Checked against the TTS buffer on every streamed token
+_SENTENCE_ENDS = (".", "!", "?", "\n", ",", ";", "–")
+_APPROX_WORDS_FOR_INITIAL_CHUNK = 8
+# Sentence end (plus any closing quotes/brackets) followed by whitespace, i.e. a boundary inside a token like ". The"
+_SENTENCE_BOUNDARY_RE = re.compile(r'[.!?…]["\')\]]*\s')
+# How far before the new text to start scanning, so closing quotes from the previous token still match
+_BOUNDARY_LOOKBEHIND = 3
+
 class OutputHandler:
     """Handles converting LLM responses to speech and managing playback with interruptions."""
     
@@ -23,30 +31,38 @@ class OutputHandler:
         self._current_interrupt_event: Optional[threading.Event] = None 
         print("OutputHandler initialized.")
         
-    async def _process_tts_buffer(self, tts_buffer: str, initial_words_spoken: bool, interrupt_event: threading.Event, status_queue: Optional[Queue]) -> tuple[str, bool, bool]:
-        """Determines if a chunk should be spoken, synthesizes, sends audio via queue, returns updated buffer & state."""
+    async def _process_tts_buffer(self, tts_buffer: str, initial_words_spoken: bool, interrupt_event: threading.Event, status_queue: Optional[Queue], scan_from: Optional[int] = None) -> tuple[str, bool, bool]:
+        """Determines if a chunk should be spoken, synthesizes, sends audio via queue, returns updated buffer & state.
+
+        scan_from is where the newly streamed text starts; only that part is searched for a mid-buffer sentence boundary.
+        """
         tts_handler: Optional[TTSHandler] = self.component_manager.tts_handler
         audio_handler: Optional[AudioHandler] = self.component_manager.audio_handler
         interrupted = False
         speak_this_chunk = False
-        sentence_ends = (".", "!", "?", "\n", ",", ";", "–")
-        approx_words_for_initial_chunk = 8
+        split_at = len(tts_buffer)
         
         if not tts_handler:
              print("Warning: TTS handler not available in _process_tts_buffer.")
              return tts_buffer, initial_words_spoken, False 
 
-        if not initial_words_spoken:
-            word_count = tts_buffer.count(' ') + 1 
-            if word_count >= approx_words_for_initial_chunk or any(tts_buffer.endswith(punc) for punc in sentence_ends):
+        # str.endswith takes the tuple directly; no per-token generator
+        if tts_buffer.endswith(_SENTENCE_ENDS):
+            speak_this_chunk = True
+        elif not initial_words_spoken and tts_buffer.count(' ') + 1 >= _APPROX_WORDS_FOR_INITIAL_CHUNK:
+            speak_this_chunk = True
+        elif scan_from is not None:
+            # A token such as ". The" ends a sentence without ending the buffer; speak up to the last boundary
+            last_boundary = None
+            for last_boundary in _SENTENCE_BOUNDARY_RE.finditer(tts_buffer, max(0, scan_from - _BOUNDARY_LOOKBEHIND)):
+                pass
+            if last_boundary:
                 speak_this_chunk = True
-        else:
-            if any(tts_buffer.endswith(punc) for punc in sentence_ends):
-                 speak_this_chunk = True
+                split_at = last_boundary.end()
                  
-        if speak_this_chunk and tts_buffer.strip():
-            chunk_to_speak = tts_buffer.strip()
-            remaining_buffer = "" 
+        if speak_this_chunk and tts_buffer[:split_at].strip():
+            chunk_to_speak = tts_buffer[:split_at].strip()
+            remaining_buffer = tts_buffer[split_at:]
             initial_words_spoken = True 
             try:
                 print(f"    \n---> Synthesizing chunk: '{chunk_to_speak}'") # Log input chunk
@@ -95,10 +111,10 @@ class OutputHandler:
                             audio_bytes = audio_array
 
                         if audio_bytes:
-                            base64_audio = base64.b64encode(audio_bytes).decode('utf-8')
+                            # Raw PCM; the API server sends it as a binary WebSocket frame (no base64)
                             await status_queue.put({
                                 "type": "audio_chunk", 
-                                "data": base64_audio,
+                                "data": audio_bytes,
                                 "sample_rate": sample_rate,
                                 "format": "pcm_s16le"
                             })
@@ -165,6 +181,7 @@ class OutputHandler:
         self._current_interrupt_event = interrupt_event # Store the event for the interrupt() method
         interrupted = False
         full_response_text = ""
+        response_parts = [] # Tokens as streamed; joined once below instead of growing a str per token
         tts_buffer = ""
         initial_words_spoken = False
         # Initialize final_status_code to COMPLETED, assume success unless specific errors occur
@@ -188,12 +205,13 @@ class OutputHandler:
                 async for token in response_source: 
                     if interrupt_event.is_set(): interrupted = True; break
                     # print(token, end="", flush=True) # Replaced by queue
-                    full_response_text += token
+                    response_parts.append(token)
+                    scan_from = len(tts_buffer)
                     tts_buffer += token
                     
-                    tts_buffer, initial_words_spoken, chunk_interrupted = await self._process_tts_buffer(tts_buffer, initial_words_spoken, interrupt_event, status_queue)
+                    tts_buffer, initial_words_spoken, chunk_interrupted = await self._process_tts_buffer(tts_buffer, initial_words_spoken, interrupt_event, status_queue, scan_from)
                     if chunk_interrupted: interrupted = True; break
-                    await asyncio.sleep(0.01)
+                    # No per-token sleep: the async stream already suspends while waiting for the next token
                 # print() # No console print
 
             # --- Handle Sync Generator --- 
@@ -202,21 +220,22 @@ class OutputHandler:
                  # if the generator itself blocks, but allows awaiting async functions inside.
                  for token in response_source:
                      if interrupt_event.is_set(): interrupted = True; break
-                     full_response_text += token
+                     response_parts.append(token)
+                     scan_from = len(tts_buffer)
                      tts_buffer += token
                      # Await the async helper method
-                     tts_buffer, initial_words_spoken, chunk_interrupted = await self._process_tts_buffer(tts_buffer, initial_words_spoken, interrupt_event, status_queue)
+                     tts_buffer, initial_words_spoken, chunk_interrupted = await self._process_tts_buffer(tts_buffer, initial_words_spoken, interrupt_event, status_queue, scan_from)
                      if chunk_interrupted: interrupted = True; break
-                     # Yield control to the event loop
-                     await asyncio.sleep(0.01) 
+                     # Yield control to the event loop (a bare yield; a timed sleep added 10 ms per token)
+                     await asyncio.sleep(0)
                  # print() # No console print
 
             # --- Handle String Input --- 
             elif isinstance(response_source, str):
-                full_response_text = response_source
-                if full_response_text.strip():
+                response_parts.append(response_source)
+                if response_source.strip():
                     try:
-                        tts_buffer, initial_words_spoken, chunk_interrupted = await self._process_tts_buffer(full_response_text, False, interrupt_event, status_queue)
+                        tts_buffer, initial_words_spoken, chunk_interrupted = await self._process_tts_buffer(response_source, False, interrupt_event, status_queue)
                         if chunk_interrupted: interrupted = True
                     except Exception as e:
                         print(f"\nError synthesizing/queueing full string: {e}")
@@ -227,6 +246,8 @@ class OutputHandler:
                  await put_status("Error", f"Unexpected response type: {type(response_source)}")
                  return ("ERROR", f"Unexpected response type: {type(response_source)}")
 
+            full_response_text = "".join(response_parts)
+
             if not interrupted and tts_buffer.strip():
                  try:
                      _, _, chunk_interrupted = await self._process_tts_buffer(tts_buffer.strip(), initial_words_spoken, interrupt_event, status_queue)
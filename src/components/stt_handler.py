@@ -1,5 +1,6 @@
 import torch
 import os
+import ctranslate2 # Installed with faster-whisper
 from faster_whisper import WhisperModel
 import numpy as np
 import time
@@ -11,8 +12,16 @@ class Transcriber:
         self.model_id = config.get("model_id", "Systran/faster-whisper-small")
         
         self.beam_size = config.get("beam_size", 5)
-        self.compute_type = config.get("compute_type", "int8")  # Changed to int8 for better compatibility
-        self.device = config.get("device", "cuda" if torch.cuda.is_available() else "cpu")
+        # "auto" resolves to CUDA with int8 weights / fp16 activations when a GPU is present, else CPU int8
+        self.device = config.get("device", "auto")
+        if self.device == "auto":
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device_index = config.get("device_index", 0)
+        self.compute_type = config.get("compute_type", "auto")
+        if self.compute_type == "auto":
+            self.compute_type = self._resolve_auto_compute_type()
+        # 0 keeps CTranslate2's own default; the embedder already leaves it half the cores (TORCH_NUM_THREADS)
+        self.cpu_threads = config.get("cpu_threads", 0)
         self.download_root = config.get("download_root")
         
         try:
@@ -21,10 +30,13 @@ class Transcriber:
             self.model = WhisperModel(
                 self.model_id,
                 device=self.device,
+                device_index=self.device_index,
                 compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
                 download_root=self.download_root
             )
-            print(f"Successfully loaded model: {self.model_id}")
+            print(f"Successfully loaded model: {self.model_id} (device={self.device}, compute_type={self.compute_type})")
+            self._warmup()
             
             # Store beam size for transcription
             self.beam_size = self.beam_size
@@ -34,6 +46,31 @@ class Transcriber:
         
         self.pipe = None  # Not used with faster-whisper
 
+    def _resolve_auto_compute_type(self):
+        """Picks int8 weights (fp16 activations on GPU) when the device supports them, else leaves "auto" to CTranslate2."""
+        if self.device != "cuda":
+            return "int8"
+        # Not every GPU has efficient int8/fp16 kernels; WhisperModel raises on an unsupported type
+        device_index = self.device_index[0] if isinstance(self.device_index, (list, tuple)) else self.device_index
+        try:
+            supported = ctranslate2.get_supported_compute_types("cuda", device_index)
+        except Exception as e:
+            print(f"Could not query supported compute types ({e}); letting CTranslate2 choose.")
+            return "auto"
+        return "int8_float16" if "int8_float16" in supported else "auto"
+
+    def _warmup(self):
+        """Run one second of silence through the model so the first real utterance doesn't pay for kernel/allocator setup."""
+        try:
+            start_time = time.time()
+            segments, _ = self.model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1)
+            # segments is a lazy generator; decoding only happens once it's consumed
+            for _ in segments:
+                pass
+            print(f"Whisper warmup finished in {time.time() - start_time:.2f} seconds")
+        except Exception as e:
+            print(f"Whisper warmup failed (continuing): {e}")
+
     def transcribe(self, audio_file):
         """Transcribe audio file to text.
         
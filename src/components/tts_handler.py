@@ -9,6 +9,8 @@ import random
 import time
 
 
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
 class TTSHandler:
     def __init__(self, config=None):
         config = config.get("kokoro", {})
@@ -178,5 +180,5 @@ class TTSHandler:
             return np.zeros(0, dtype=np.float32)
     
     def _split_into_sentences(self, text):
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = _SENTENCE_SPLIT_RE.split(text)
         return sentences 
\ No newline at end of file
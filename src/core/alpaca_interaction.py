@@ -1,13 +1,7 @@
 # src/core/interaction_handler.py
 
-import time
 import traceback
-import types
-import threading
 import asyncio
-from asyncio import Queue # Import Queue
-import soundfile as sf 
-import sys # Ensure sys is imported if used elsewhere
 
 from utils.component_manager import ComponentManager
 from utils.conversation_manager import ConversationManager
@@ -242,10 +236,9 @@ class AlpacaInteraction:
                     # want a specific 'Looping' status.
                     # Let's rely on the 'Listening' status from the *next* cycle start.
                     print("Loop: Interaction finished, looping back to listen...")
-                    await asyncio.sleep(0.1) # Small delay before next cycle
                 
-                # Check for cancellation request between cycles
-                await asyncio.sleep(0) # Yield control to allow cancellation check
+                # Yield once between cycles so a pending cancel lands here; no fixed delay before listening again
+                await asyncio.sleep(0)
 
         except asyncio.CancelledError:
              print("[Interaction Loop] Loop task cancelled.")
@@ -1,72 +1,147 @@
+import os
 import sys
 import traceback
 import types
-import time # Import time
+import asyncio
 
-def run_text_interaction_loop(assistant):
-    """Runs the main interaction loop for text mode synchronously."""
-    print("Starting TEXT mode interaction loop... (Type 'quit' or 'exit' to stop)")
-    
+from core.voice_loop import error_backoff
+from utils.summarizer import start_compaction_if_needed, finish_compaction
+
+# Bytes read from stdin past the last returned line (a pipe can deliver several lines in one read)
+_stdin_pending = bytearray()
+
+async def _wait_readable(loop, fd):
+    """Waits until fd has data (or EOF) without blocking the event loop."""
+    readable = loop.create_future()
+    loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+    try:
+        await readable
+    finally:
+        loop.remove_reader(fd)
+
+async def _read_stdin_line():
+    """Reads one line from stdin without blocking the event loop where the loop supports it.
+
+    Waiting on stdin via the event loop keeps signal handlers (and task cancellation)
+    responsive while the user is at the prompt. The fd is read raw and split here: a
+    buffered readline() could swallow later lines that the fd would then never report.
+    Falls back to a blocking read on loops without add_reader support (e.g. the Windows
+    proactor loop) or non-pollable stdin.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        fd = sys.stdin.fileno()
+    except (OSError, ValueError):
+        return sys.stdin.readline()
+    encoding = sys.stdin.encoding or "utf-8"
     while True:
+        newline = _stdin_pending.find(b"\n")
+        if newline >= 0:
+            line = bytes(_stdin_pending[:newline + 1])
+            del _stdin_pending[:newline + 1]
+            return line.decode(encoding, errors="replace")
         try:
-            print("You: ", end="", flush=True)
+            await _wait_readable(loop, fd)
+        except (NotImplementedError, OSError, ValueError):
+            if _stdin_pending:
+                # Finish the partial line already taken off the fd
+                line = bytes(_stdin_pending).decode(encoding, errors="replace") + sys.stdin.readline()
+                _stdin_pending.clear()
+                return line
+            return sys.stdin.readline()
+        data = os.read(fd, 4096)
+        if not data: # EOF: hand back any unterminated last line, then "" on the next call
+            line = bytes(_stdin_pending)
+            _stdin_pending.clear()
+            return line.decode(encoding, errors="replace")
+        _stdin_pending.extend(data)
+
+async def run_text_interaction_loop(assistant):
+    """Runs the main interaction loop for text mode."""
+    print("Starting TEXT mode interaction loop... (Type 'quit' or 'exit' to stop)")
+    consecutive_errors = 0
+    # Bound once; neither changes for the life of the loop
+    run_interaction = assistant.interaction_handler.run_single_text_interaction
+    add_assistant_message = assistant.conversation_manager.add_assistant_message
+    llm_handler_inst = assistant.component_manager.llm_handler
+    compaction_task = None
+    
+    try:
+        while True:
             try:
-                user_input_line = sys.stdin.readline()
-                if not user_input_line: # Handle EOF
-                     print("\nExiting text mode loop (EOF).")
-                     break
-                user_input = user_input_line.strip()
-            except KeyboardInterrupt:
-                 print("\n[Text Loop] KeyboardInterrupt received, exiting loop...")
-                 break # Exit loop on Ctrl+C during input
+                print("You: ", end="", flush=True)
+                try:
+                    user_input_line = await _read_stdin_line()
+                    if not user_input_line: # Handle EOF
+                         print("\nExiting text mode loop (EOF).")
+                         break
+                    user_input = user_input_line.strip()
+                except KeyboardInterrupt:
+                     print("\n[Text Loop] KeyboardInterrupt received, exiting loop...")
+                     break # Exit loop on Ctrl+C during input
 
-            # Process input
-            if user_input.lower() in ['quit', 'exit']:
-                print("Exiting text mode loop.")
-                break
+                # Process input
+                if user_input.lower() in ['quit', 'exit']:
+                    print("Exiting text mode loop.")
+                    break
 
-            if not user_input:
-                continue
+                if not user_input:
+                    continue
 
-            print("Assistant: Thinking...") 
-            response_generator = assistant.interaction_handler.run_single_text_interaction(user_input)
+                print("Assistant: Thinking...") 
+                response_generator = await run_interaction(user_input)
 
-            # Stream the output and accumulate the full response
-            response_chunks = []
-            print("Assistant: ", end="", flush=True) # Print prefix before streaming
-            try:
-                if isinstance(response_generator, types.GeneratorType):
-                    for chunk in response_generator:
-                        print(chunk, end="", flush=True)
-                        response_chunks.append(chunk)
-                elif isinstance(response_generator, str):
-                     print(response_generator)
-                     response_chunks.append(response_generator)
-                else:
-                    print(f"\nError: Unexpected response type: {type(response_generator)}")
-                    continue
+                # Stream the output and accumulate the full response
+                response_chunks = []
+                print("Assistant: ", end="", flush=True) # Print prefix before streaming
+                try:
+                    if isinstance(response_generator, types.AsyncGeneratorType):
+                        async for chunk in response_generator:
+                            print(chunk, end="", flush=True)
+                            response_chunks.append(chunk)
+                    elif isinstance(response_generator, types.GeneratorType):
+                        try:
+                            for chunk in response_generator:
+                                print(chunk, end="", flush=True)
+                                response_chunks.append(chunk)
+                                # Yield to the loop between tokens so a shutdown signal cancels mid-answer
+                                await asyncio.sleep(0)
+                        finally:
+                            response_generator.close()
+                    elif isinstance(response_generator, str):
+                         print(response_generator)
+                         response_chunks.append(response_generator)
+                    else:
+                        print(f"\nError: Unexpected response type: {type(response_generator)}")
+                        continue
 
-                print() # Print final newline
-            except Exception as e:
-                print(f"\nError during response streaming: {e}")
-                traceback.print_exc()
-                continue
+                    print() # Print final newline
+                except Exception as e:
+                    print(f"\nError during response streaming: {e}")
+                    traceback.print_exc()
+                    continue
 
-            full_response_text = "".join(response_chunks)
-            if full_response_text and not full_response_text.startswith(("[Error", "ERROR:")):
-                 assistant.conversation_manager.add_assistant_message(full_response_text)
-            elif not full_response_text:
-                 print("Warning: Assistant generated an empty response after streaming.")
+                full_response_text = "".join(response_chunks)
+                if full_response_text and not full_response_text.startswith(("[Error", "ERROR:")):
+                     add_assistant_message(full_response_text)
+                elif not full_response_text:
+                     print("Warning: Assistant generated an empty response after streaming.")
+                consecutive_errors = 0
+                # Old turns are summarized in the background so history (and the prompt) stays bounded
+                compaction_task = start_compaction_if_needed(assistant.conversation_manager, llm_handler_inst, compaction_task)
 
-        except KeyboardInterrupt:
-            print("\n[Text Loop] KeyboardInterrupt caught, exiting.")
-            break
-        except Exception as loop_e:
-            print(f"\nError during text interaction loop iteration: {loop_e}")
-            traceback.print_exc()
-            print("Attempting to recover...")
-            try:
-                time.sleep(2)
             except KeyboardInterrupt:
-                 print("\n[Text Loop] Recovery interrupted, exiting loop.")
-                 break
\ No newline at end of file
+                print("\n[Text Loop] KeyboardInterrupt caught, exiting.")
+                break
+            except Exception as loop_e:
+                print(f"\nError during text interaction loop iteration: {loop_e}")
+                traceback.print_exc()
+                print("Attempting to recover...")
+                try:
+                    await asyncio.sleep(error_backoff(consecutive_errors))
+                    consecutive_errors += 1
+                except KeyboardInterrupt:
+                     print("\n[Text Loop] Recovery interrupted, exiting loop.")
+                     break
+    finally:
+        await finish_compaction(compaction_task)
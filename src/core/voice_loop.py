@@ -1,29 +1,51 @@
 import traceback
-import time # Import time for sleep
+import asyncio
+import random
 
-def run_voice_interaction_loop(assistant, duration, timeout, phrase_limit):
-    """Runs the main interaction loop for voice mode synchronously."""
+from utils.summarizer import start_compaction_if_needed, finish_compaction
+
+def error_backoff(consecutive_errors):
+    """Seconds to wait before retrying: exponential in the error streak, capped, plus jitter."""
+    return min(10.0, 0.1 * 2 ** consecutive_errors) + random.uniform(0, 0.1)
+
+async def run_voice_interaction_loop(assistant, duration, timeout, phrase_limit):
+    """Runs the main interaction loop for voice mode."""
     print("Starting VOICE mode interaction loop...")
-    while True:
-        try:
-            user_input_status, assistant_output = assistant.interaction_handler.run_single_interaction(
-                duration=duration,
-                timeout=timeout,
-                phrase_limit=phrase_limit
-            )
-            
-            if user_input_status == "ERROR":
-                print(f"Recovering from interaction error: {assistant_output}")
-                time.sleep(2)
-            elif user_input_status == "INTERRUPTED":
-                 print("Interaction interrupted, starting new loop.")
+    consecutive_errors = 0
+    # Bound once; the handler doesn't change for the life of the loop
+    run_interaction = assistant.interaction_handler.run_single_interaction
+    conv_manager = assistant.conversation_manager
+    llm_handler_inst = assistant.component_manager.llm_handler
+    compaction_task = None
+    try:
+        while True:
+            try:
+                user_input_status, assistant_output = await run_interaction(
+                    duration=duration,
+                    timeout=timeout,
+                    phrase_limit=phrase_limit
+                )
+                
+                if user_input_status == "ERROR":
+                    print(f"Recovering from interaction error: {assistant_output}")
+                    await asyncio.sleep(error_backoff(consecutive_errors))
+                    consecutive_errors += 1
+                elif user_input_status == "INTERRUPTED":
+                     print("Interaction interrupted, starting new loop.")
+                elif user_input_status == "COMPLETED":
+                     consecutive_errors = 0
+                # Old turns are summarized in the background so history (and the prompt) stays bounded
+                compaction_task = start_compaction_if_needed(conv_manager, llm_handler_inst, compaction_task)
 
-        except KeyboardInterrupt:
-            print("[Voice Loop] KeyboardInterrupt received, propagating up...")
-            raise
-            
-        except Exception as loop_e:
-            print(f"\nUnexpected error during voice interaction: {loop_e}")
-            traceback.print_exc()
-            print("Attempting to recover after error...")
-            time.sleep(2)
+            except KeyboardInterrupt:
+                print("[Voice Loop] KeyboardInterrupt received, propagating up...")
+                raise
+                
+            except Exception as loop_e:
+                print(f"\nUnexpected error during voice interaction: {loop_e}")
+                traceback.print_exc()
+                print("Attempting to recover after error...")
+                await asyncio.sleep(error_backoff(consecutive_errors))
+                consecutive_errors += 1
+    finally:
+        await finish_compaction(compaction_task)
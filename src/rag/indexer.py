@@ -1,31 +1,116 @@
 # src/rag/indexer.py
+import asyncio
+import contextlib
 import json
 import os
 import sys
 import gc
+import hashlib
+import threading
 import traceback
 from minirag import MiniRAG
 from minirag.llm.ollama import ollama_model_complete
-from minirag.llm.hf import hf_embed
 from minirag.utils import EmbeddingFunc
+from utils.batch_io import iter_read_bytes
+from utils.config_loader import env_flag
+import torch
 from transformers import AutoModel, AutoTokenizer
 from datetime import datetime
-from dotenv import load_dotenv
+
+def _configure_torch_threads():
+    """Caps torch's CPU pools so embedding doesn't oversubscribe cores shared with CTranslate2 (Whisper) and audio threads."""
+    num_threads = int(os.getenv('TORCH_NUM_THREADS', str(max(1, (os.cpu_count() or 2) // 2))))
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set before the first inter-op parallel work in the process
+        pass
+
+_configure_torch_threads()
+
+def _hf_embed_blocking(texts, tokenizer, embed_model, autocast_dtype=None):
+    """Same computation as minirag's hf_embed, as a plain function so it can run in a worker thread."""
+    device = next(embed_model.parameters()).device
+    input_ids = tokenizer(
+        texts, return_tensors="pt", padding=True, truncation=True
+    ).input_ids.to(device)
+    autocast = torch.autocast(device.type, dtype=autocast_dtype) if autocast_dtype else contextlib.nullcontext()
+    with torch.inference_mode(), autocast:
+        outputs = embed_model(input_ids)
+        embeddings = outputs.last_hidden_state.mean(dim=1)
+    if embeddings.dtype != torch.float32:
+        embeddings = embeddings.to(torch.float32)
+    return embeddings.detach().cpu().numpy()
+
+def _autocast_dtype(embed_model):
+    """Half-precision dtype to autocast the embedding forward pass to, or None to stay in fp32.
+
+    fp16 on CUDA; bf16 on CPUs with native bf16 kernels (AVX-512 BF16/AMX). Int8-quantized
+    models are left alone since their dynamic Linear kernels take fp32 input.
+    """
+    device_type = next(embed_model.parameters()).device.type
+    if device_type == 'cuda':
+        return torch.float16
+    if device_type != 'cpu':
+        return None
+    if any(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in embed_model.modules()):
+        return None
+    try:
+        return torch.bfloat16 if torch.ops.mkldnn._is_mkldnn_bf16_supported() else None
+    except Exception:
+        return None
+
+# Indexing and the RAG querier (LLMHandler) start concurrently and embed with the same model
+_EMBEDDING_MODELS = {}
+_EMBEDDING_MODELS_LOCK = threading.Lock()
+# ...and share one EmbeddingFunc per model too (MiniRAG only wraps it, never mutates it)
+_EMBEDDING_FUNCS = {}
+
+def _maybe_quantize(embed_model):
+    """Swaps the model's Linear layers for dynamic int8 kernels on CPU (EMBEDDING_QUANTIZE, default on)."""
+    if not env_flag('EMBEDDING_QUANTIZE', True) or next(embed_model.parameters()).device.type != 'cpu':
+        return embed_model
+    try:
+        quantized = torch.ao.quantization.quantize_dynamic(embed_model, {torch.nn.Linear}, dtype=torch.qint8)
+        print("Embedding model quantized to dynamic int8.")
+        return quantized
+    except Exception as e:
+        print(f"Warning: int8 quantization of embedding model failed, using fp32: {e}")
+        return embed_model
+
+def _load_embedding_model(model_name):
+    """Loads the tokenizer and model once per process and returns the shared pair."""
+    with _EMBEDDING_MODELS_LOCK:
+        if model_name not in _EMBEDDING_MODELS:
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            embed_model = AutoModel.from_pretrained(model_name).eval()
+            if torch.cuda.is_available():
+                # fp16 autocast on GPU (see _autocast_dtype); int8 quantization below only applies on CPU
+                embed_model = embed_model.to('cuda')
+            embed_model = _maybe_quantize(embed_model)
+            _EMBEDDING_MODELS[model_name] = (tokenizer, embed_model)
+        return _EMBEDDING_MODELS[model_name]
 
 def setup_embedding_func(model_name):
-    """Initializes the embedding function using Hugging Face transformers."""
+    """Initializes the embedding function using Hugging Face transformers. Returns the cached instance on later calls."""
+    if model_name in _EMBEDDING_FUNCS:
+        return _EMBEDDING_FUNCS[model_name]
     try:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        embed_model = AutoModel.from_pretrained(model_name)
+        tokenizer, embed_model = _load_embedding_model(model_name)
+        autocast_dtype = _autocast_dtype(embed_model)
         # Use a fixed embedding dimension common for MiniLM models
         # You might need to adjust if using a different embedding model type
         embedding_dim = 384 
-        print(f"Embedding model '{model_name}' loaded. Dimension: {embedding_dim}")
-        return EmbeddingFunc(
+        print(f"Embedding model '{model_name}' loaded. Dimension: {embedding_dim}, autocast: {autocast_dtype or 'off'}")
+        embedding_func = EmbeddingFunc(
             embedding_dim=embedding_dim,
             max_token_size=1000, # Adjust if needed
-            func=lambda texts: hf_embed(texts, tokenizer=tokenizer, embed_model=embed_model),
+            # hf_embed is async in name only; its forward pass would block the event loop MiniRAG runs on
+            func=lambda texts: asyncio.to_thread(_hf_embed_blocking, texts, tokenizer, embed_model, autocast_dtype),
         )
+        # setdefault: if indexing and the querier raced here, both get the same instance
+        return _EMBEDDING_FUNCS.setdefault(model_name, embedding_func)
     except Exception as e:
         print(f"Error loading embedding model '{model_name}': {e}. Exiting.")
         sys.exit(1)
@@ -38,29 +123,52 @@ def find_txt_files(root_path):
         return txt_files
         
     print(f"Searching for .txt files in: {root_path}")
-    for root, dirs, files in os.walk(root_path):
-        # Skip hidden directories
-        dirs[:] = [d for d in dirs if not d.startswith('.')]
-        for file in files:
-            # Skip hidden files and macOS metadata files
-            if file.endswith(".txt") and not file.startswith('.') and not file.startswith('._'):
-                full_path = os.path.join(root, file)
-                txt_files.append(full_path)
+    # scandir's DirEntry carries the file type from the directory listing, so no stat() per entry; like os.walk, symlinked dirs aren't followed
+    pending_dirs = [root_path]
+    while pending_dirs:
+        current_dir = pending_dirs.pop()
+        try:
+            with os.scandir(current_dir) as entries:
+                for entry in entries:
+                    # Skip hidden files/directories and macOS metadata files
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+                    elif entry.name.endswith(".txt"):
+                        txt_files.append(entry.path)
+        except OSError as e:
+            print(f"Warning: Could not scan directory {current_dir}: {e}")
                 
     print(f"Found {len(txt_files)} .txt files to potentially process.")
     return txt_files
 
+def compute_corpus_fingerprint(file_paths, *settings):
+    """Hashes file paths, sizes and mtimes (not contents) plus indexing settings.
+
+    Cheap O(files) stat-only check used to detect whether the corpus changed since the last index run.
+    """
+    digest = hashlib.sha1()
+    for setting in settings:
+        digest.update(f"{setting}\0".encode("utf-8"))
+    for file_path in sorted(file_paths):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        digest.update(f"{file_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
 # Make run_indexing async
 def run_indexing():
-    load_dotenv() # Load environment variables from .env
-
+    # Environment (.env) is loaded once by the entrypoint before indexing starts
     # --- Configuration from Environment Variables ---
     WORKING_DIR = os.getenv('WORKING_DIR')
     DATA_PATH = os.getenv('DATA_PATH')
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL')
     EXTRACTION_LLM_MODEL = os.getenv('EXTRACTION_LLM_MODEL')
     LLM_MAX_TOKEN_SIZE = int(os.getenv('LLM_MAX_TOKEN_SIZE', '200')) # Default 200
-    LLM_MAX_ASYNC = int(os.getenv('LLM_MAX_ASYNC', '1')) # Default 1
+    LLM_MAX_ASYNC = int(os.getenv('LLM_MAX_ASYNC', '4')) # Default 4: batched extraction keeps several requests in flight
 
     # Validate required variables
     required_vars = {'WORKING_DIR': WORKING_DIR, 'DATA_PATH': DATA_PATH, 
@@ -81,6 +189,22 @@ def run_indexing():
     
     os.makedirs(WORKING_DIR, exist_ok=True)
 
+    # --- Skip everything (model load included) if the corpus hasn't changed ---
+    files_to_process = find_txt_files(DATA_PATH)
+    fingerprint_path = os.path.join(WORKING_DIR, ".index_fingerprint")
+    # The quantize flag changes the stored vectors' numeric path, so flipping it must re-index
+    current_fingerprint = compute_corpus_fingerprint(files_to_process, EMBEDDING_MODEL, EXTRACTION_LLM_MODEL,
+                                                     f"quantize={env_flag('EMBEDDING_QUANTIZE', True)}")
+    try:
+        with open(fingerprint_path, "r", encoding="utf-8") as fp_file:
+            if fp_file.read().strip() == current_fingerprint:
+                print("RAG index up-to-date, skipping.")
+                return
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not read index fingerprint {fingerprint_path}: {e}")
+
     embedding_func = setup_embedding_func(EMBEDDING_MODEL)
     print(f"\n--- Initializing MiniRAG for Extraction ({EXTRACTION_LLM_MODEL}) ---")
     try:
@@ -111,63 +235,73 @@ def run_indexing():
 
     # --- Indexing Phase ---
     print("\n--- Starting Indexing Phase ---")
-    files_to_process = find_txt_files(DATA_PATH)
     processed_count = 0
-    skipped_count = 0
     error_count = 0
 
-    for i, file_path in enumerate(files_to_process):
-        file_key = file_path 
-        if doc_status.get(file_key, {}).get("status") == "processed":
-            skipped_count += 1
-            continue
+    pending_files = [p for p in files_to_process if doc_status.get(p, {}).get("status") != "processed"]
+    skipped_count = len(files_to_process) - len(pending_files)
 
-        print(f"--- Processing file {i+1}/{len(files_to_process)}: {file_path} --- ")
+    # Each ainsert() call re-runs entity extraction over every processed document, so pending
+    # files are inserted as one batch rather than one call (and one extraction pass) per file
+    batch_paths = []
+    batch_contents = []
+    for i, (file_path, raw_content) in enumerate(iter_read_bytes(pending_files)):
+        print(f"--- Reading file {i+1}/{len(pending_files)}: {file_path} --- ")
         try:
-            print(f"[{datetime.now()}] Reading file content...")
-            # Consider using aiofiles for async file reading if files are large
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            
-            if not content.strip():
-                 print(f"[{datetime.now()}] Skipping empty file.")
-                 doc_status[file_key] = {"status": "skipped_empty", "timestamp": str(datetime.now())}
-                 skipped_count += 1
-            else:
-                print(f"[{datetime.now()}] Starting MiniRAG insert...")
-                # --- Use await ainsert --- 
-                rag_extractor.insert(content) 
-                # -------------------------
-                print(f"[{datetime.now()}] Finished MiniRAG insert.")
-                doc_status[file_key] = {"status": "processed", "timestamp": str(datetime.now())}
-                processed_count += 1
-
-            # Update status file after each file
-            try:
-                # Consider async file write if needed
-                with open(kv_store_path, "w", encoding="utf-8") as kv_file:
-                    json.dump(doc_status, kv_file, indent=4)
-            except Exception as e:
-                 print(f"Warning: Could not write status update to {kv_store_path}: {e}")
-
+            if isinstance(raw_content, Exception):
+                raise raw_content
+            # Same newline handling as reading the file in text mode
+            content = raw_content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
         except Exception as e:
-            print(f"***** Error processing file {file_path}: {e} *****")
-            # Log original traceback for the specific file error
-            traceback.print_exc() 
-            doc_status[file_key] = {"status": "error", "error_message": str(e), "timestamp": str(datetime.now())}
+            print(f"***** Error reading file {file_path}: {e} *****")
+            doc_status[file_path] = {"status": "error", "error_message": str(e), "timestamp": str(datetime.now())}
             error_count += 1
-            # Save status even on error
-            try:
-                with open(kv_store_path, "w", encoding="utf-8") as kv_file:
-                    json.dump(doc_status, kv_file, indent=4)
-            except Exception as e_save:
-                 print(f"Warning: Could not write error status update to {kv_store_path}: {e_save}")
-            # Decide whether to continue or stop on error
-            # break 
+            continue
+
+        if not content.strip():
+            print(f"[{datetime.now()}] Skipping empty file.")
+            doc_status[file_path] = {"status": "skipped_empty", "timestamp": str(datetime.now())}
+            skipped_count += 1
+        else:
+            batch_paths.append(file_path)
+            batch_contents.append(content)
+
+    if batch_contents:
+        # One loop for the insert; MiniRAG.insert() would spin up a fresh loop via asyncio.run
+        insert_loop = asyncio.new_event_loop()
+        try:
+            print(f"[{datetime.now()}] Starting MiniRAG insert of {len(batch_contents)} document(s)...")
+            insert_loop.run_until_complete(rag_extractor.ainsert(batch_contents))
+            print(f"[{datetime.now()}] Finished MiniRAG insert.")
+            for file_path in batch_paths:
+                doc_status[file_path] = {"status": "processed", "timestamp": str(datetime.now())}
+            processed_count += len(batch_paths)
+        except Exception as e:
+            print(f"***** Error inserting batch of {len(batch_paths)} file(s): {e} *****")
+            traceback.print_exc()
+            for file_path in batch_paths:
+                doc_status[file_path] = {"status": "error", "error_message": str(e), "timestamp": str(datetime.now())}
+            error_count += len(batch_paths)
+        finally:
+            insert_loop.close()
+
+    try:
+        with open(kv_store_path, "w", encoding="utf-8") as kv_file:
+            json.dump(doc_status, kv_file, indent=4)
+    except Exception as e:
+        print(f"Warning: Could not write status update to {kv_store_path}: {e}")
 
     print("\n--- Indexing Phase Complete ---")
     print(f"Summary: Processed={processed_count}, Skipped={skipped_count}, Errors={error_count}")
 
+    # Only record the fingerprint for a clean run so failed files are retried next start
+    if error_count == 0:
+        try:
+            with open(fingerprint_path, "w", encoding="utf-8") as fp_file:
+                fp_file.write(current_fingerprint)
+        except Exception as e:
+            print(f"Warning: Could not write index fingerprint {fingerprint_path}: {e}")
+
     # Optional cleanup
     del rag_extractor
     gc.collect()
@@ -13,6 +13,7 @@ __version__ = "1.0.0"
 __author__ = "lightrag Team"
 __status__ = "Production"
 
+import asyncio
 import sys
 
 from minirag.base import BaseKVStorage
@@ -46,6 +47,24 @@ import numpy as np
 from typing import Union, Optional
 
 
+# One AsyncClient, and so one keep-alive connection pool, per event loop and endpoint.
+# httpx pools belong to the loop that first used them, hence the per-loop key.
+_ASYNC_CLIENTS = {}
+
+
+def _get_async_client(host, timeout, headers) -> ollama.AsyncClient:
+    loop = asyncio.get_running_loop()
+    for stale_loop in [l for l in list(_ASYNC_CLIENTS) if l.is_closed()]:
+        _ASYNC_CLIENTS.pop(stale_loop, None)
+    clients = _ASYNC_CLIENTS.setdefault(loop, {})
+    key = (host, timeout, tuple(sorted(headers.items())))
+    client = clients.get(key)
+    if client is None:
+        client = ollama.AsyncClient(host=host, timeout=timeout, headers=headers)
+        clients[key] = client
+    return client
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -101,7 +120,7 @@ async def ollama_model_if_cache(
         if api_key
         else {"Content-Type": "application/json"}
     )
-    ollama_client = ollama.AsyncClient(host=host, timeout=timeout, headers=headers)
+    ollama_client = _get_async_client(host, timeout, headers)
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
@@ -128,8 +147,9 @@ async def ollama_model_if_cache(
         async def inner():
             try:
                 async for chunk in response:
-                    if chunk.get('message') and chunk['message'].get('content'):
-                        yield chunk['message']['content']
+                    content = chunk.message.content
+                    if content:
+                        yield content
             except Exception as e:
                  print(f"\nError during Ollama stream processing: {e}")
                  yield f"[Error during streaming: {e}]"
@@ -0,0 +1,36 @@
+# src/utils/batch_io.py
+
+import collections
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_PREFETCH = 8
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def iter_read_bytes(paths, prefetch=DEFAULT_PREFETCH):
+    """Yields (path, data) in order while up to `prefetch` upcoming files are read in the background.
+
+    `data` is the file's bytes, or the OSError raised while reading it, so one bad file
+    doesn't abort the batch. Lets callers overlap file I/O with per-file processing.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    with ThreadPoolExecutor(max_workers=min(prefetch, len(paths))) as executor:
+        path_iter = iter(paths)
+        pending = collections.deque(
+            (path, executor.submit(_read_bytes, path)) for path in itertools.islice(path_iter, prefetch)
+        )
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(path_iter, None)
+            if next_path is not None:
+                pending.append((next_path, executor.submit(_read_bytes, next_path)))
+            try:
+                data = future.result()
+            except OSError as e:
+                data = e
+            yield path, data
@@ -8,6 +8,12 @@ from components.tts_handler import TTSHandler
 import traceback
 import gc
 import os
+import threading
+import time
+
+# Upper bound on how long cleanup() waits for handler teardown before moving on; closers run on
+# daemon threads, so one that hangs past this can't hold up process exit either
+HANDLER_CLEANUP_TIMEOUT = 5.0
 
 class ComponentManager:
     def __init__(self, asr_config=None, tts_config=None, llm_config=None, mode='voice'):
@@ -149,6 +155,31 @@ class ComponentManager:
 
     def cleanup(self):
         """Clean up all managed components by deleting them, checking if they exist."""
+        # Handlers with their own teardown (threads, audio streams) are closed on daemon threads
+        handler_names = ('tts_handler', 'llm_handler', 'transcriber', 'audio_handler')
+        closers = {}
+        for name in handler_names:
+            handler = getattr(self, name, None)
+            closer = getattr(handler, 'cleanup', None)
+            if handler and callable(closer):
+                closers[name] = closer
+        if closers:
+            def run_closer(name, closer):
+                try:
+                    closer()
+                except Exception as e:
+                    print(f"Error cleaning up {name}: {e}")
+
+            threads = [threading.Thread(target=run_closer, args=(name, closer), daemon=True, name=f"cleanup-{name}")
+                       for name, closer in closers.items()]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + HANDLER_CLEANUP_TIMEOUT
+            for thread in threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+                if thread.is_alive():
+                    print(f"Warning: {thread.name[len('cleanup-'):]} cleanup did not finish within {HANDLER_CLEANUP_TIMEOUT}s.")
+
         if hasattr(self, 'tts_handler') and self.tts_handler:
             print("Deleting TTS handler...")
             del self.tts_handler
@@ -168,4 +199,4 @@ class ComponentManager:
             self.audio_handler = None
             
         gc.collect() # Suggest garbage collection after deleting
-        print("ComponentManager cleanup finished.") 
\ No newline at end of file
+        print("ComponentManager cleanup finished.")
\ No newline at end of file
@@ -1,9 +1,64 @@
 # src/core/config_loader.py
 
-import json
+import copy
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import os
+from utils import fastjson
 from utils.override_maps import ASR_OVERRIDE_MAP, TTS_OVERRIDE_MAP, LLM_OVERRIDE_MAP
 from utils.override_maps import apply_overrides
+from utils.config_schema import validate_assistant_params
+
+# Resolved once at import; the config directory never moves while the process runs
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_CONFIG_DIR = os.path.join(_PROJECT_ROOT, 'src', 'config')
+DEFAULT_CONFIG_PATHS = {
+    'asr': os.path.join(_CONFIG_DIR, 'conf_asr.json'),
+    'tts': os.path.join(_CONFIG_DIR, 'conf_tts.json'),
+    'llm': os.path.join(_CONFIG_DIR, 'conf_llm.json')
+}
+
+# Every environment variable that feeds into load_all(); part of its cache key
+_ENV_KEYS = ('ASR_PRESET', 'TTS_PRESET', 'LLM_PRESET', 'FIXED_DURATION', 'TIMEOUT', 'PHRASE_LIMIT',
+             *ASR_OVERRIDE_MAP, *TTS_OVERRIDE_MAP, *LLM_OVERRIDE_MAP)
+
+def clean_env_var(value_str, remove_comments=False):
+    """Cleans environment variable string: strips whitespace, quotes, and optionally comments."""
+    if not isinstance(value_str, str):
+        return value_str # Return original if not a string
+
+    cleaned = value_str
+    if remove_comments:
+        cleaned = cleaned.split('#')[0]
+
+    # Strip whitespace first, then quotes
+    cleaned = cleaned.strip().strip('"').strip("'")
+    return cleaned
+
+def env_flag(name, default=False):
+    """Reads a true/false environment variable, tolerating quotes and trailing # comments."""
+    value = clean_env_var(os.getenv(name), remove_comments=True)
+    if not value:
+        return default
+    return value.lower() == 'true'
+
+def _file_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+@functools.lru_cache(maxsize=16)
+def _parse_config_file(abs_path, mtime):
+    """Parses a JSON config file. Cached on (path, mtime) so unchanged files are only parsed once."""
+    with open(abs_path, 'rb') as f:
+        return fastjson.loads(f.read())
+
+def clear_config_cache():
+    """Drops all cached config file parses, forcing the next load to re-read from disk."""
+    _parse_config_file.cache_clear()
+    ConfigLoader._load_all_cached.cache_clear()
+
 class ConfigLoader:
     def __init__(self):
         """Initialize the config loader."""
@@ -15,12 +70,14 @@ class ConfigLoader:
 
     def load_config_file(self, config_file):
         try:
-            if not os.path.exists(config_file):
-                 print(f"Warning: Config file not found: {config_file}")
-                 return {}
-            with open(config_file, 'r') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
+            abs_path = os.path.abspath(config_file)
+            parsed = _parse_config_file(abs_path, os.path.getmtime(abs_path))
+            # Callers apply env overrides in place, so never hand out the cached object
+            return copy.deepcopy(parsed)
+        except FileNotFoundError:
+            print(f"Warning: Config file not found: {config_file}")
+            return {}
+        except ValueError: # json.JSONDecodeError / orjson.JSONDecodeError both subclass ValueError
             print(f"Warning: Error decoding JSON from file: {config_file}")
             return {}
         except Exception as e:
@@ -29,33 +86,18 @@ class ConfigLoader:
 
     def get_default_config_paths(self):
         """Gets default paths for config files relative to the project root."""
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        config_dir = os.path.join(project_root, 'src', 'config')
-        return {
-            'asr': os.path.join(config_dir, 'conf_asr.json'),
-            'tts': os.path.join(config_dir, 'conf_tts.json'),
-            'llm': os.path.join(config_dir, 'conf_llm.json')
-        }
+        return DEFAULT_CONFIG_PATHS
 
     def _clean_env_var(self, value_str, remove_comments=False):
         """Cleans environment variable string: strips whitespace, quotes, and optionally comments."""
-        if not isinstance(value_str, str):
-            return value_str # Return original if not a string
-        
-        cleaned = value_str
-        if remove_comments:
-            cleaned = cleaned.split('#')[0]
-            
-        # Strip whitespace first, then quotes
-        cleaned = cleaned.strip().strip('"').strip("'")
-        return cleaned
+        return clean_env_var(value_str, remove_comments)
 
     def _load_preset_config(self, component_type, preset_name):
         default_paths = self.get_default_config_paths()
         config_path = default_paths.get(component_type)
         
         conf_all = self.load_config_file(config_path)
-        config = conf_all.get(preset_name, {})
+        config = conf_all.get(preset_name) or conf_all.get('default', {})
         return config
 
 
@@ -65,9 +107,12 @@ class ConfigLoader:
         tts_preset = os.getenv('TTS_PRESET', 'default')
         llm_preset = os.getenv('LLM_PRESET', 'default')
 
-        self.asr_config = self._load_preset_config('asr', asr_preset)
-        self.tts_config = self._load_preset_config('tts', tts_preset)
-        self.llm_config = self._load_preset_config('llm', llm_preset)
+        # The three preset files are independent, so read and parse them concurrently
+        presets = (('asr', asr_preset), ('tts', tts_preset), ('llm', llm_preset))
+        with ThreadPoolExecutor(max_workers=len(presets)) as executor:
+            self.asr_config, self.tts_config, self.llm_config = executor.map(
+                lambda preset: self._load_preset_config(*preset), presets
+            )
         
         apply_overrides(self, self.asr_config, ASR_OVERRIDE_MAP)
         apply_overrides(self, self.tts_config, TTS_OVERRIDE_MAP)
@@ -129,7 +174,34 @@ class ConfigLoader:
         self.assistant_params = params
         return params
 
+    @classmethod
+    @functools.lru_cache(maxsize=1)
+    def _load_all_cached(cls, mtimes, env_snapshot):
+        """Builds assistant parameters once per (config mtimes, env snapshot) key."""
+        loader = cls()
+        loader.load_configs_from_env()
+        params = loader.get_assistant_parameters()
+        if params is None:
+            return None
+        # Validated here so each distinct config is checked once and bad values fail before Alpaca init
+        try:
+            validate_assistant_params(params)
+        except ValueError as e:
+            print(f"Error: Invalid configuration: {e}")
+            return None
+        return params
+
     def load_all(self):
         """Load all configurations from env/JSON. Returns assistant parameters."""
-        self.load_configs_from_env()
-        return self.get_assistant_parameters() 
\ No newline at end of file
+        mtimes = tuple(_file_mtime(path) for path in self.get_default_config_paths().values())
+        env_snapshot = tuple(os.environ.get(key) for key in _ENV_KEYS)
+        params = self._load_all_cached(mtimes, env_snapshot)
+        if params is None:
+            return None
+        # Hand out a private copy so callers can't mutate the cached result
+        params = copy.deepcopy(params)
+        self.asr_config = params['asr_config']
+        self.tts_config = params['tts_config']
+        self.llm_config = params['llm_config']
+        self.assistant_params = params
+        return params 
\ No newline at end of file
@@ -0,0 +1,86 @@
+# src/utils/config_schema.py
+
+# Schema for the parameters ConfigLoader.load_all() hands to Alpaca.
+# Compiled once at import so validation is a plain function call at startup.
+
+_COMPONENT_CONFIG = {"type": "object"}
+_OPTIONAL_INT = {"type": ["integer", "null"], "minimum": 0}
+
+ASSISTANT_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "required": ["asr_config", "tts_config", "llm_config", "duration", "timeout", "phrase_limit"],
+    "properties": {
+        "asr_config": {
+            **_COMPONENT_CONFIG,
+            "properties": {
+                "asr_name": {"type": "string"},
+                "model": {"type": "string"},
+                "audio_validation": {"type": "object"},
+            },
+        },
+        "tts_config": {
+            **_COMPONENT_CONFIG,
+            "properties": {
+                "tts_name": {"type": "string"},
+                "model": {"type": "string"},
+                "kokoro": {
+                    "type": "object",
+                    "properties": {
+                        "voice": {"type": "string"},
+                        "speed": {"type": "number", "exclusiveMinimum": 0},
+                        "sample_rate": {"type": "integer", "minimum": 1},
+                    },
+                },
+            },
+        },
+        "llm_config": {
+            **_COMPONENT_CONFIG,
+            "properties": {
+                "model": {"type": "string"},
+                "system_prompt": {"type": "string"},
+                "local": {
+                    "type": "object",
+                    "properties": {
+                        "temperature": {"type": "number", "minimum": 0},
+                        "top_p": {"type": "number", "minimum": 0, "maximum": 1},
+                        "top_k": {"type": "integer", "minimum": 0},
+                        "max_tokens": {"type": "integer", "minimum": 1},
+                        "n_ctx": {"type": "integer", "minimum": 1},
+                        "repeat_penalty": {"type": "number", "minimum": 0},
+                    },
+                },
+            },
+        },
+        "duration": _OPTIONAL_INT,
+        "timeout": _OPTIONAL_INT,
+        "phrase_limit": _OPTIONAL_INT,
+    },
+}
+
+try:
+    import fastjsonschema
+    VALIDATOR = fastjsonschema.compile(ASSISTANT_SCHEMA)
+except ImportError:
+    fastjsonschema = None
+
+    def VALIDATOR(params):
+        """Fallback when fastjsonschema isn't installed: checks the top-level shape only."""
+        if not isinstance(params, dict):
+            raise ValueError("data must be object")
+        for key in ASSISTANT_SCHEMA["required"]:
+            if key not in params:
+                raise ValueError(f"data must contain ['{key}'] properties")
+        for key in ("asr_config", "tts_config", "llm_config"):
+            if not isinstance(params[key], dict):
+                raise ValueError(f"data.{key} must be object")
+        for key in ("duration", "timeout", "phrase_limit"):
+            value = params[key]
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+                raise ValueError(f"data.{key} must be a non-negative integer or null")
+        return params
+
+def validate_assistant_params(params):
+    """Validates assistant parameters against ASSISTANT_SCHEMA. Raises ValueError if malformed."""
+    # fastjsonschema's JsonSchemaValueException subclasses ValueError
+    return VALIDATOR(params)
@@ -2,6 +2,13 @@
 
 from datetime import timedelta
 
+# Content prefix marking a system message that stands in for compacted older turns
+SUMMARY_PREFIX = "[Summary]: "
+
+def is_summary_message(message: dict) -> bool:
+    """True for the synthetic summary block that replaces compacted history."""
+    return message.get('role') == 'system' and message.get('content', '').startswith(SUMMARY_PREFIX)
+
 def format_timedelta(delta: timedelta) -> str:
         """Formats timedelta into human-readable string (e.g., '5 minutes ago')."""
         seconds = int(delta.total_seconds())
@@ -40,6 +47,10 @@ class ConversationManager:
         """Return the current conversation history."""
         return self.conversation_history
 
+    def replace_range(self, start, end, message):
+        """Replace history[start:end] with a single message (used to collapse old turns into a summary)."""
+        self.conversation_history[start:end] = [message]
+
     def clear_history(self, keep_system_prompt=True):
         """Clear the conversation history, optionally keeping the system prompt."""
         if keep_system_prompt:
@@ -0,0 +1,32 @@
+# src/utils/fastjson.py
+
+import json
+
+# Prefer the C-accelerated parsers when available, fall back to stdlib json
+try:
+    import orjson as _backend
+    BACKEND = "orjson"
+except ImportError:
+    try:
+        import ujson as _backend
+        BACKEND = "ujson"
+    except ImportError:
+        _backend = json
+        BACKEND = "json"
+
+def loads(data):
+    """Parses JSON from bytes or str using the fastest available backend."""
+    return _backend.loads(data)
+
+if BACKEND == "orjson":
+    def dumps(obj):
+        """Serializes obj to a compact JSON str using the fastest available backend."""
+        return _backend.dumps(obj).decode('utf-8')
+elif BACKEND == "ujson":
+    def dumps(obj):
+        """Serializes obj to a compact JSON str using the fastest available backend."""
+        return _backend.dumps(obj, ensure_ascii=False)
+else:
+    def dumps(obj):
+        """Serializes obj to a compact JSON str using the fastest available backend."""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
@@ -1,12 +1,21 @@
 # src/utils/session_utils.py
 
 from datetime import datetime
+import asyncio
+import hashlib
+import json
 import os
 import traceback
 import ollama # Import ollama
 
 from components.llm_handler import LLMHandler 
-from .conversation_manager import ConversationManager 
+from .conversation_manager import ConversationManager, SUMMARY_PREFIX, is_summary_message
+
+# Rolling compaction: once history reaches COMPACT_THRESHOLD messages, everything but the
+# newest COMPACT_KEEP_RECENT is collapsed into one summary block
+COMPACT_THRESHOLD = int(os.getenv('HISTORY_COMPACT_THRESHOLD', '40'))
+COMPACT_KEEP_RECENT = int(os.getenv('HISTORY_KEEP_RECENT', '10'))
+COMPACTION_CHECKPOINT_NAME = "compaction_checkpoint.json"
 
 SUMMARY_PROMPT_TEMPLATE = """
 **TASK:** Objectively summarize the provided conversation history between a User and an AI Assistant.
@@ -34,7 +43,7 @@ def _format_history_for_prompt(history: list[dict]) -> str:
 
 def _call_ollama_sync_for_summary(model_name: str, messages: list[dict], params: dict) -> str:
     """Calls ollama.chat synchronously and consumes the stream."""
-    full_summary = ""
+    summary_parts = []
     try:
         response_stream = ollama.chat(
             model=model_name,
@@ -44,9 +53,10 @@ def _call_ollama_sync_for_summary(model_name: str, messages: list[dict], params:
         )
         # Consume the SYNCHRONOUS stream
         for chunk in response_stream:
-            if 'message' in chunk and 'content' in chunk['message']:
-                full_summary += chunk['message']['content']
-        return full_summary.strip()
+            content = chunk.message.content
+            if content:
+                summary_parts.append(content)
+        return "".join(summary_parts).strip()
     except Exception as e:
         print(f"[Summarizer Sync Helper] Error during Ollama call: {e}")
         traceback.print_exc()
@@ -58,7 +68,8 @@ def summarize_conversation(history: list[dict], llm_handler: LLMHandler) -> str:
         print("[Summarizer] History is empty, skipping summarization.")
         return ""
 
-    user_assistant_history = [msg for msg in history if msg['role'] in ('user', 'assistant')]
+    # Earlier compaction summaries are kept so the new summary covers the whole session
+    user_assistant_history = [msg for msg in history if msg['role'] in ('user', 'assistant') or is_summary_message(msg)]
     if not user_assistant_history:
         print("[Summarizer] No user/assistant messages found in history, skipping summarization.")
         return ""
@@ -106,6 +117,15 @@ def summarize_conversation(history: list[dict], llm_handler: LLMHandler) -> str:
         traceback.print_exc()
         return "[Error generating summary]"
 
+def _atomic_write_text(path: str, text: str):
+    """Writes text via a temp file and os.replace, so a crash never leaves a truncated file behind."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def save_summary(summary: str, history_length: int, base_data_path: str):
     """Saves the summary text and metadata to a timestamped file within the specified base data path."""
     if not summary or summary == "[Error generating summary]":
@@ -127,10 +147,79 @@ def save_summary(summary: str, history_length: int, base_data_path: str):
         metadata = f"Timestamp: {datetime.now().isoformat()}\nTurns: {history_length}\n---\n"
         content_to_write = metadata + summary
 
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write(content_to_write)
+        # Atomic so a kill mid-write can't leave a truncated summary for the next session to load
+        _atomic_write_text(filename, content_to_write)
 
     except IOError as e:
         print(f"[Summarizer] Error saving summary file {filename}: {e}")
     except Exception as e:
         print(f"[Summarizer] Unexpected error during summary saving: {e}")
+
+def _save_compaction_checkpoint(base_data_path: str, start: int, end: int, block: list[dict], summary: str):
+    """Records which messages were compacted (positions, sizes, hashes only; no content)."""
+    if not base_data_path:
+        return
+    try:
+        summaries_dir = os.path.join(base_data_path, "summaries")
+        os.makedirs(summaries_dir, exist_ok=True)
+        checkpoint = {
+            "timestamp": datetime.now().isoformat(),
+            "range": [start, end],
+            "message_count": len(block),
+            "message_sizes": [len(msg.get('content', '')) for msg in block],
+            "message_hashes": [hashlib.sha1(msg.get('content', '').encode("utf-8")).hexdigest() for msg in block],
+            "summary_chars": len(summary),
+        }
+        _atomic_write_text(os.path.join(summaries_dir, COMPACTION_CHECKPOINT_NAME), json.dumps(checkpoint, indent=2))
+    except Exception as e:
+        print(f"[Summarizer] Warning: Could not write compaction checkpoint: {e}")
+
+def compact_history(conv_manager: ConversationManager, llm_handler: LLMHandler) -> bool:
+    """Collapses all but the most recent messages into a single summary block. Blocking; run in a thread."""
+    history = conv_manager.get_history()
+    if len(history) < COMPACT_THRESHOLD:
+        return False
+
+    start = 1 if history and history[0] is conv_manager.system_prompt else 0
+    end = len(history) - COMPACT_KEEP_RECENT
+    if end - start < 2:
+        return False
+    block = history[start:end] # Snapshot; new turns only ever append past `end`
+    snapshot_len = len(history)
+
+    print(f"[Summarizer] Compacting {len(block)} older messages into a summary block...")
+    summary = summarize_conversation(block, llm_handler)
+    if not summary or summary.startswith("[Error"):
+        print("[Summarizer] Compaction skipped: no usable summary.")
+        return False
+
+    # The summary took a while; only splice it in if the summarized messages are still where they were
+    current = conv_manager.get_history()
+    if (current is not history or len(current) < snapshot_len
+            or any(a is not b for a, b in zip(current[start:end], block))):
+        print("[Summarizer] Compaction skipped: history changed while summarizing.")
+        return False
+    conv_manager.replace_range(start, end, {"role": "system", "content": SUMMARY_PREFIX + summary})
+    _save_compaction_checkpoint(llm_handler.base_data_path, start, end, block, summary)
+    print(f"[Summarizer] History compacted to {len(conv_manager.get_history())} messages.")
+    return True
+
+def start_compaction_if_needed(conv_manager: ConversationManager, llm_handler: LLMHandler, running_task=None):
+    """Starts compact_history in the background once the threshold is crossed.
+
+    Must be called from the event loop. Returns the compaction task in flight, if any,
+    so callers can pass it back in and never run two compactions at once.
+    """
+    if running_task is not None and not running_task.done():
+        return running_task
+    if llm_handler is None or len(conv_manager.get_history()) < COMPACT_THRESHOLD:
+        return None
+    return asyncio.create_task(asyncio.to_thread(compact_history, conv_manager, llm_handler))
+
+async def finish_compaction(running_task):
+    """Waits for an in-flight compaction so nothing rewrites history after the loop exits."""
+    if running_task is None or running_task.done():
+        return
+    print("[Summarizer] Waiting for background compaction to finish...")
+    # The worker thread can't be interrupted, so cancelling would only abandon it mid-rewrite
+    await asyncio.gather(running_task, return_exceptions=True)